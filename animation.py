@@ -0,0 +1,26 @@
+class Animation(object):
+    # Animation a pas fixe (clignotement...) avec au plus un minuteur `after` vivant :
+    # start() sur une animation deja lancee ne fait rien, stop() annule le minuteur.
+    # Une fois arretee, l'application ne se reveille plus pour elle.
+    def __init__(self, widget, interval, step):
+        self.widget = widget
+        self.interval = interval
+        self.step = step
+        self._timer = None
+
+    @property
+    def running(self):
+        return self._timer is not None
+
+    def start(self):
+        if self._timer is None:
+            self._timer = self.widget.after(self.interval, self._tick)
+
+    def stop(self):
+        if self._timer is not None:
+            self.widget.after_cancel(self._timer)
+            self._timer = None
+
+    def _tick(self):
+        self._timer = self.widget.after(self.interval, self._tick)
+        self.step()
@@ -0,0 +1,46 @@
+from PIL import Image, ImageTk
+
+
+class ThumbnailAtlas(object):
+    # Toutes les vignettes d'une page composees dans une seule image (une colonne,
+    # bords compris), affichee par un seul item de Canvas : un seul objet image Tk
+    # au lieu d'un Label et d'un PhotoImage par recette.
+    def __init__(self, canvas, x, y, tile_size, row_height, count, background="#ffffff",
+                 placeholder_fill="#e0e0e0", tags=()):
+        self.canvas = canvas
+        self.tile_size = tile_size
+        self.row_height = row_height
+        self.atlas = Image.new('RGB', (tile_size[0], row_height * count), background)
+        # Toutes les cases d'attente d'un coup
+        for idx in range(count):
+            self.atlas.paste(placeholder_fill, self._box(idx, tile_size))
+        self.photo = ImageTk.PhotoImage(self.atlas)
+        self.item = canvas.create_image(x, y, image=self.photo, anchor='nw', tags=tags)
+        self._flush_pending = False
+
+    def _box(self, idx, size):
+        # Case centree verticalement dans la ligne idx
+        left = (self.tile_size[0] - size[0]) // 2
+        top = idx * self.row_height + (self.row_height - size[1]) // 2
+        return left, top, left + size[0], top + size[1]
+
+    def set_tile(self, idx, img):
+        # Colle la vignette dans l'atlas ; la mise a jour de l'image Tk est regroupee
+        # (une seule copie pour toutes les vignettes arrivees dans le meme tour de boucle)
+        if img.width > self.tile_size[0] or img.height > self.row_height:
+            img = img.copy()
+            img.thumbnail((self.tile_size[0], self.row_height))
+        self.atlas.paste(img, self._box(idx, img.size))
+        if not self._flush_pending:
+            self._flush_pending = True
+            self.canvas.after_idle(self.flush)
+
+    def flush(self):
+        self._flush_pending = False
+        if self.photo is not None:
+            self.photo.paste(self.atlas)
+
+    def destroy(self):
+        self.canvas.delete(self.item)
+        self.photo = None
+        self.atlas = None
@@ -0,0 +1,102 @@
+# Reglages partages par les applications (reseau, caches, images...).
+
+import os
+
+# Image de secours livree avec l'application (aucun telechargement au demarrage).
+DEFAULT_IMAGE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "not_found.png")
+
+# Taille des pools de connexions keep-alive, par hote.
+HTTP_POOL_SIZES = {
+    "api.spoonacular.com": 4,
+    "img.spoonacular.com": 8,
+    "spoonacular.com": 8,
+}
+# Pool utilise pour tous les autres hotes (images Edamam, page par defaut...).
+HTTP_POOL_DEFAULT_SIZE = 4
+# Nombre de pools d'hotes gardes en memoire pour le pool par defaut.
+HTTP_POOL_DEFAULT_HOSTS = 10
+# Timeouts (connexion, lecture) en secondes : par defaut, puis par etape.
+HTTP_TIMEOUT = (3.05, 10)
+API_TIMEOUT = (3.05, 10)
+IMAGE_TIMEOUT = (3.05, 6)
+# Nouvelles tentatives automatiques sur erreur de connexion ou de lecture (GET).
+HTTP_RETRIES = 2
+HTTP_RETRY_BACKOFF = 0.2
+
+# Recettes par page de resultats, et au plus SEARCH_MAX_RESULTS en tout (limite de
+# findByIngredients).
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_RESULTS = 100
+# Nombre maximal de telechargements d'images simultanes.
+IMAGE_FETCH_WORKERS = 6
+# Threads utilises par le moteur asyncio pour les appels bloquants : API et caches d'un
+# cote, telechargements d'images (tentatives couvertes comprises) de l'autre.
+ENGINE_IO_THREADS = 4
+IMAGE_IO_THREADS = 2 * IMAGE_FETCH_WORKERS
+# Duree (ms) d'une frame de l'interface : les mises a jour postees par le moteur sont
+# appliquees par lots a ce rythme, et seulement tant qu'il y a du travail en cours.
+UI_FRAME_MS = 16
+
+# Dossier des caches persistants (reponses de l'API, images).
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".recipe_app")
+# Duree de validite (secondes) d'une reponse findByIngredients en cache.
+RESPONSE_CACHE_TTL = 24 * 60 * 60
+# Taille maximale (octets) du cache de reponses ; les entrees les moins
+# recemment utilisees sont supprimees au-dela.
+RESPONSE_CACHE_MAX_BYTES = 20 * 1024 * 1024
+# Budget disque (octets) du cache d'images ; eviction LRU au-dela.
+IMAGE_CACHE_MAX_BYTES = 100 * 1024 * 1024
+# Age (secondes) a partir duquel une image en cache est revalidee aupres du serveur
+# (ETag / Last-Modified) avant d'etre reutilisee.
+IMAGE_CACHE_MAX_AGE = 7 * 24 * 60 * 60
+
+# Limites de debit par fournisseur : (points par seconde, rafale maximale).
+# Spoonacular compte en points (1 point + 0.01 par resultat pour findByIngredients),
+# Edamam en requetes (10 par minute sur l'offre gratuite).
+RATE_LIMITS = {
+    "spoonacular": (1.0, 5.0),
+    "edamam": (10 / 60, 10.0),
+}
+# Nombre de nouvelles tentatives apres un 429 ou une erreur 5xx.
+RATE_LIMIT_MAX_RETRIES = 3
+# Backoff exponentiel (secondes) : base et plafond, avec gigue aleatoire.
+RATE_LIMIT_BACKOFF_BASE = 0.5
+RATE_LIMIT_BACKOFF_MAX = 30
+# Attente maximale (secondes) avant un appel a l'API ; au-dela (quota journalier epuise,
+# Retry-After tres long), la recherche echoue tout de suite au lieu d'attendre.
+RATE_LIMIT_MAX_WAIT = 10
+
+# Requetes "couvertes" pour les images : si la premiere tentative depasse le p95
+# des temps observes, une seconde part en parallele et la plus rapide gagne.
+IMAGE_HEDGING = True
+# Nombre de mesures necessaires avant de couvrir, et taille de la fenetre de mesures.
+IMAGE_HEDGING_MIN_SAMPLES = 20
+IMAGE_HEDGING_WINDOW = 200
+
+# Processus de preparation des images (decodage, bord, redimensionnement) ;
+# None = un par coeur.
+IMAGE_PROCESS_WORKERS = None
+# Au-dela de ce nombre de pixels, une image est refusee (protection "decompression bomb").
+IMAGE_MAX_PIXELS = 40_000_000
+# Budget memoire (octets) du cache d'images a trois niveaux, et sa repartition entre
+# PhotoImage Tk, images PIL decodees et octets compresses.
+IMAGE_MEMORY_BUDGET = 64 * 1024 * 1024
+IMAGE_MEMORY_TIER_SHARES = (0.25, 0.25, 0.5)
+# Telechargement des images par morceaux : taille d'un morceau, taille maximale
+# acceptee, et nombre d'octets au-dela duquel on cesse de chercher l'en-tete.
+IMAGE_CHUNK_SIZE = 64 * 1024
+IMAGE_MAX_BYTES = 5 * 1024 * 1024
+IMAGE_HEADER_PROBE_BYTES = 256 * 1024
+
+# Affichage des resultats en atlas : vignettes composees en une seule image et
+# textes dessines directement sur le Canvas (moins d'objets Tk pour les grandes pages).
+RESULTS_ATLAS = False
+# Liste virtualisee : lignes creees en plus de celles visibles, au-dessus et en dessous.
+VIRTUAL_LIST_OVERSCAN = 2
+# Nombre de lignes avant la fin de la liste a partir duquel la page suivante est demandee.
+SCROLL_PAGE_THRESHOLD = 5
+# Recherche pendant la frappe : delai sans frappe (ms) avant d'appeler l'API, longueur
+# minimale du texte, et recettes deja recues gardees pour les reponses locales.
+SEARCH_DEBOUNCE_MS = 400
+SEARCH_MIN_CHARS = 3
+INSTANT_MAX_RECIPES = 2000
@@ -0,0 +1,421 @@
+import asyncio
+import functools
+import itertools
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import config
+from hedging import LatencyTracker, hedged
+from rate_limit import QuotaExhausted, RateLimiter, is_retryable, spoonacular_cost
+from response_cache import canonical_key
+from singleflight import SingleFlight
+from thumbnails import init_worker, prepare_thumbnail, read_image_response, thumbnail_from_buffer
+
+SEARCH_URL = 'https://api.spoonacular.com/recipes/findByIngredients'
+
+
+class SearchEngine(object):
+    # Moteur de recherche asynchrone : une seule boucle asyncio dans un thread de fond
+    # execute l'appel a l'API et tous les telechargements d'images sous forme de
+    # coroutines. Il ne connait pas Tk : les resultats sont passes a `post` (depuis le
+    # thread du moteur), par defaut la file thread-safe `events`, qu'un mode sans
+    # interface lit directement. L'interface y branche son UiDispatcher.
+    def __init__(self, session, api_key, thumbnail_size, thumbnail_border=0,
+                 response_cache=None, image_store=None, rate_limiter=None, memory_cache=None,
+                 post=None, corpus=None):
+        self.session = session
+        self.api_key = api_key
+        # Taille d'affichage des vignettes : les images sont decodees directement a cette taille
+        self.thumbnail_size = thumbnail_size
+        self.thumbnail_border = thumbnail_border
+        self.response_cache = response_cache
+        self.image_store = image_store
+        # Cache memoire a niveaux (PhotoImage / PIL / octets), partage avec l'interface
+        self.memory_cache = memory_cache
+        # Corpus local (index inverse) : repond sans reseau quand il a une page complete
+        self.corpus = corpus
+        # Debit vers l'API regle d'avance (quota en points), plutot que de se faire refuser
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.events = queue.Queue()
+        self.post = post or self.events.put
+        self._search_ids = itertools.count(1)
+        # requests est bloquant : les appels reseau passent par de petits pools bornes,
+        # partages par toutes les coroutines, au lieu d'un thread par requete. Les images
+        # (et leurs tentatives couvertes, qui continuent dans leur thread apres annulation)
+        # ont le leur : elles ne peuvent pas faire attendre l'appel a l'API.
+        self._executor = ThreadPoolExecutor(max_workers=config.ENGINE_IO_THREADS,
+                                            thread_name_prefix="engine-io")
+        self._image_executor = ThreadPoolExecutor(max_workers=config.IMAGE_IO_THREADS,
+                                                  thread_name_prefix="engine-images")
+        # Le travail PIL (decodage, bord, redimensionnement) tourne dans des processus :
+        # il n'entre pas en concurrence avec Tk pour le GIL, et une image corrompue
+        # ne peut faire tomber que son processus.
+        self._image_pool = self._new_image_pool()
+        self._image_limit = asyncio.Semaphore(config.IMAGE_FETCH_WORKERS)
+        self._image_latency = LatencyTracker(config.IMAGE_HEDGING_WINDOW, config.IMAGE_HEDGING_MIN_SAMPLES)
+        # Les recherches et images identiques deja en cours partagent un seul appel
+        self._flights = SingleFlight()
+        # Recherche en cours et ses lots d'images : une nouvelle recherche les annule
+        self._current_search = None
+        self._current_search_id = None
+        self._search_tasks = set()
+        # La recherche courante a-t-elle ete servie par le corpus local ? Ses pages
+        # suivantes viennent de la meme source (les deux ne classent pas pareil)
+        self._search_from_corpus = None
+        # Travaux (recherches, lots d'images) pas encore termines, voir busy()
+        self._jobs = 0
+        self._jobs_lock = threading.Lock()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name="search-engine", daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    def submit(self, coro):
+        # Planifie une coroutine sur la boucle du moteur (appelable depuis n'importe quel thread)
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def run(self, coro, timeout=None):
+        # Version bloquante de submit, pour les appels synchrones
+        return self.submit(coro).result(timeout)
+
+    def busy(self):
+        # True tant qu'une recherche ou un lot d'images est en cours
+        with self._jobs_lock:
+            return self._jobs > 0
+
+    def _job_started(self):
+        with self._jobs_lock:
+            self._jobs += 1
+
+    def _job_finished(self, *args):
+        with self._jobs_lock:
+            self._jobs -= 1
+
+    def search(self, ingredients, number=None, prefetch_images=None, paginate=False):
+        # Lance une recherche complete et renvoie son identifiant, qui sert de jeton de
+        # generation : la recherche precedente, si elle tourne encore, est annulee
+        # (appel API, images et decodage en attente). Les evenements
+        # ("recipes", id, recettes), ("image", id, index, cle, image) puis ("done", id, recettes)
+        # ou ("cancelled", id) sont ensuite passes a self.post ; ("quota", id, secondes)
+        # precede ("recipes", id, None) si le quota de l'API est epuise. `cle` vaut
+        # (url, taille, bord) ; image vaut None en cas d'echec, ou quand le PhotoImage de
+        # cette cle est deja dans le cache memoire.
+        # Seules les images des `prefetch_images` premieres recettes (toutes si None) sont
+        # chargees d'office ; les autres le sont a la demande (request_images).
+        # Avec `paginate`, la page suivante est ensuite prechargee (JSON et vignettes) en
+        # tache de fond ; sans, elle ne l'est qu'au premier load_page.
+        search_id = next(self._search_ids)
+        number = config.SEARCH_PAGE_SIZE if number is None else number
+        self._job_started()
+        self._loop.call_soon_threadsafe(self._start_search, search_id, ingredients, number, prefetch_images,
+                                        paginate)
+        return search_id
+
+    def request_images(self, search_id, items):
+        # Charge les vignettes [(index, url), ...] d'une recherche deja affichee ; les
+        # evenements ("image", ...) arrivent comme pour la recherche elle-meme.
+        self._job_started()
+        self._loop.call_soon_threadsafe(self._start_job, search_id, self._fetch_images, search_id, items)
+
+    def load_page(self, search_id, ingredients, page, prefetch_next=False):
+        # Page suivante (0 = celle de search) : ("page", id, page, recettes) est passe a
+        # self.post ; recettes est vide apres la derniere page. Avec `prefetch_next`, la
+        # page d'apres est prechargee a son tour.
+        self._job_started()
+        self._loop.call_soon_threadsafe(self._start_job, search_id, self._load_page, search_id, ingredients, page,
+                                        prefetch_next)
+
+    def cancel(self):
+        # Abandonne la recherche en cours (et ses lots d'images, ses prechargements) ;
+        # ("cancelled", id) est passe a self.post si elle n'etait pas finie
+        self._loop.call_soon_threadsafe(self._cancel_search)
+
+    def _cancel_search(self):
+        if self._current_search is not None and not self._current_search.done():
+            self._current_search.cancel()
+        for task in self._search_tasks:
+            task.cancel()
+        self._search_tasks = set()
+        self._current_search_id = None
+
+    def _start_search(self, search_id, ingredients, number, prefetch_images, paginate):
+        self._cancel_search()
+        task = self._loop.create_task(self._search_pipeline(search_id, ingredients, number, prefetch_images,
+                                                            paginate))
+        task.add_done_callback(lambda done: self._search_finished(search_id, done))
+        self._current_search = task
+        self._current_search_id = search_id
+
+    def _search_finished(self, search_id, task):
+        if task.cancelled():
+            self.post(("cancelled", search_id))
+        self._job_finished()
+
+    def _start_job(self, search_id, func, *args):
+        if search_id != self._current_search_id:
+            # Recherche deja remplacee
+            self._job_finished()
+            return
+        task = self._search_task(func(*args))
+        task.add_done_callback(self._job_finished)
+
+    def _search_task(self, coro):
+        # Tache rattachee a la recherche courante : annulee avec elle
+        task = self._loop.create_task(coro)
+        self._search_tasks.add(task)
+        task.add_done_callback(self._search_tasks.discard)
+        return task
+
+    async def _run_blocking(self, func, *args, **kwargs):
+        call = functools.partial(func, *args, **kwargs)
+        return await self._loop.run_in_executor(self._executor, call)
+
+    async def _run_image_io(self, func, *args, **kwargs):
+        call = functools.partial(func, *args, **kwargs)
+        return await self._loop.run_in_executor(self._image_executor, call)
+
+    async def _get(self, url, **kwargs):
+        return await self._run_blocking(self.session.get, url, **kwargs)
+
+    def _search_params(self, ingredients, number):
+        # Plus de cache-buster aleatoire : la fraicheur est geree par le cache de
+        # reponses (duree de validite), qui peut ainsi servir les requetes repetees.
+        params = {
+            'ingredients': ','.join(ingredients),
+            'apiKey': self.api_key,
+            'number': config.SEARCH_PAGE_SIZE if number is None else number,
+        }
+        return canonical_key(SEARCH_URL, params), params
+
+    def cached_recipes(self, ingredients, number=None):
+        # Reponse deja dans le cache disque, sans reseau (None sinon) ; appel bloquant
+        # mais court, utilisable depuis l'interface
+        if self.response_cache is None:
+            return None
+        key, params = self._search_params(ingredients, number)
+        return self.response_cache.get(key)
+
+    async def find_recipes(self, ingredients, number=None):
+        recipes, from_corpus = await self._find(ingredients, number)
+        return recipes
+
+    async def _find(self, ingredients, number, corpus=None):
+        # (recettes, True si le corpus local a repondu). corpus : None = le corpus s'il a
+        # assez de recettes, sinon le cache ou l'API ; True = le corpus seul ; False = sans
+        # le corpus
+        key, params = self._search_params(ingredients, number)
+        return await self._flights.do(("search", key, corpus), lambda: self._find_recipes(key, params, corpus))
+
+    async def _find_recipes(self, key, params, corpus):
+        if self.response_cache is not None and corpus is not True:
+            cached = await self._run_blocking(self.response_cache.get, key)
+            if cached is not None:
+                return cached, False
+        local = None
+        if self.corpus is not None and corpus is not False:
+            local = await self._run_blocking(self.corpus.find_recipes, params['ingredients'].split(','),
+                                             params['number'])
+            if corpus or (local and len(local) >= params['number']):
+                return local, True
+        try:
+            response = await self._get_spoonacular(params)
+        except Exception:
+            # Hors ligne : ce que le corpus local a trouve vaut mieux que rien
+            if local:
+                return local, True
+            raise
+        if response.status_code == 200:
+            recipes = response.json()
+            if self.response_cache is not None:
+                await self._run_blocking(self.response_cache.put, key, recipes)
+            if self.corpus is not None:
+                await self._run_blocking(self.corpus.add, recipes)
+            return recipes, False
+        return (local, True) if local else (None, False)
+
+    async def _get_spoonacular(self, params):
+        cost = spoonacular_cost(params['number'])
+        for attempt in range(config.RATE_LIMIT_MAX_RETRIES + 1):
+            await asyncio.sleep(self.rate_limiter.reserve("spoonacular", cost, config.RATE_LIMIT_MAX_WAIT))
+            response = await self._get(SEARCH_URL, params=params, timeout=config.API_TIMEOUT)
+            self.rate_limiter.update_from_headers("spoonacular", response.headers)
+            if not is_retryable(response.status_code):
+                break
+            # 429 / 5xx : on recule (gigue exponentielle ou Retry-After) et on reessaie
+            delay = self.rate_limiter.backoff("spoonacular", attempt, response.headers.get('Retry-After'))
+            print(f"Spoonacular a repondu {response.status_code}, nouvel essai dans {delay:.1f} s")
+        return response
+
+    async def fetch_image_bytes(self, url):
+        if self.memory_cache is not None:
+            data = self.memory_cache.get_bytes(url)
+            if data is not None:
+                return data
+        data = await self._fetch_image_bytes_uncached(url)
+        if self.memory_cache is not None:
+            self.memory_cache.put_bytes(url, data)
+        return data
+
+    async def _fetch_image_bytes_uncached(self, url):
+        # Les images deja sur disque ne passent pas par la couverture (ni par ses mesures)
+        if self.image_store is not None:
+            data = await self._run_image_io(self.image_store.get_fresh, url)
+            if data is not None:
+                return data
+        if config.IMAGE_HEDGING:
+            return await hedged(lambda: self._fetch_image_bytes(url), self._image_latency)
+        return await self._fetch_image_bytes(url)
+
+    async def _fetch_image_bytes(self, url):
+        # Telechargement (ou revalidation) via le cache disque d'images quand il y en a un
+        if self.image_store is not None:
+            return await self._run_image_io(self.image_store.fetch, url, timeout=config.IMAGE_TIMEOUT)
+        response = await self._run_image_io(self.session.get, url, timeout=config.IMAGE_TIMEOUT, stream=True)
+        if response.status_code >= 400:
+            response.close()
+            response.raise_for_status()
+        return await self._run_image_io(read_image_response, response)
+
+    def thumbnail_key(self, url, size=None, border=None):
+        size = self.thumbnail_size if size is None else size
+        border = self.thumbnail_border if border is None else border
+        return url, size, border
+
+    async def fetch_thumbnail(self, url, size=None, border=None):
+        key = self.thumbnail_key(url, size, border)
+        if self.memory_cache is not None:
+            img = self.memory_cache.get_image(key)
+            if img is not None:
+                return img
+        return await self._flights.do(("thumbnail",) + key, lambda: self._fetch_thumbnail(key))
+
+    async def _fetch_thumbnail(self, key):
+        url, size, border = key
+        async with self._image_limit:
+            data = await self.fetch_image_bytes(url)
+        img = await self.prepare_thumbnail(data, size, border)
+        if self.memory_cache is not None:
+            self.memory_cache.put_image(key, img)
+        return img
+
+    async def prepare_thumbnail(self, data, size, border):
+        pool = self._image_pool
+        try:
+            buffer = await self._loop.run_in_executor(pool, prepare_thumbnail, data, size, border)
+        except BrokenProcessPool:
+            # Un processus de preparation est mort : on repart avec un pool neuf
+            if self._image_pool is pool:
+                self._image_pool = self._new_image_pool()
+                pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        return thumbnail_from_buffer(buffer)
+
+    def _new_image_pool(self):
+        # spawn plutot que fork : le processus a deja des threads (boucle du moteur, pools
+        # d'E/S, chargement du corpus, Tk), et un fork pourrait copier un verrou tenu.
+        # Les processus n'ont besoin que de thumbnails.
+        return ProcessPoolExecutor(max_workers=config.IMAGE_PROCESS_WORKERS, initializer=init_worker,
+                                   initargs=(config.IMAGE_MAX_PIXELS,),
+                                   mp_context=multiprocessing.get_context("spawn"))
+
+    async def _fetch_image_indexed(self, idx, url):
+        key = self.thumbnail_key(url)
+        # PhotoImage deja pret cote interface : ni reseau ni decodage
+        if self.memory_cache is not None and self.memory_cache.has_photo(key):
+            return idx, key, None
+        try:
+            return idx, key, await self.fetch_thumbnail(url)
+        except Exception as e:
+            print(f"Erreur lors du chargement de l'image : {e}")
+            return idx, key, None
+
+    async def _search_pipeline(self, search_id, ingredients, number, prefetch_images, paginate):
+        self._search_from_corpus = None
+        try:
+            recipes, self._search_from_corpus = await self._find(ingredients, number)
+        except QuotaExhausted as e:
+            # Ni cache ni corpus pour cette requete, et l'API n'est plus disponible
+            print(e)
+            self.post(("quota", search_id, e.delay))
+            recipes = None
+        except Exception as e:
+            print(f"Erreur lors de la recherche : {e}")
+            recipes = None
+        self.post(("recipes", search_id, recipes))
+        if recipes:
+            prefetched = recipes if prefetch_images is None else recipes[:prefetch_images]
+            await self._fetch_images(search_id, [(idx, recette.get('image'))
+                                                 for idx, recette in enumerate(prefetched)])
+            if paginate and len(recipes) == number:
+                self._search_task(self._prefetch_page(ingredients, 1))
+        self.post(("done", search_id, recipes))
+
+    # findByIngredients n'a pas d'offset : la page n s'obtient en demandant les
+    # (n + 1) * SEARCH_PAGE_SIZE premieres recettes et en gardant la fin. Chaque page
+    # passe par _find, donc par le cache des reponses et SingleFlight, et vient
+    # de la meme source que la premiere page.
+    async def _find_page(self, ingredients, page):
+        size = config.SEARCH_PAGE_SIZE
+        if page * size >= config.SEARCH_MAX_RESULTS:
+            return []
+        recipes, from_corpus = await self._find(ingredients, min((page + 1) * size, config.SEARCH_MAX_RESULTS),
+                                                self._search_from_corpus)
+        return (recipes or [])[page * size:(page + 1) * size]
+
+    async def _load_page(self, search_id, ingredients, page, prefetch_next):
+        try:
+            recipes = await self._find_page(ingredients, page)
+        except Exception as e:
+            print(f"Erreur lors de la recherche : {e}")
+            recipes = []
+        self.post(("page", search_id, page, recipes))
+        if prefetch_next and len(recipes) == config.SEARCH_PAGE_SIZE:
+            self._search_task(self._prefetch_page(ingredients, page + 1))
+
+    async def _prefetch_page(self, ingredients, page):
+        # Basse priorite : la reponse de l'API puis les vignettes une par une, dans les
+        # caches seulement ; l'interface les retrouve quand elle affiche la page.
+        try:
+            recipes = await self._find_page(ingredients, page)
+        except Exception as e:
+            print(f"Erreur lors du prechargement : {e}")
+            return
+        for recette in recipes:
+            url = recette.get('image')
+            if not url:
+                continue
+            try:
+                await self.fetch_thumbnail(url)
+            except Exception as e:
+                print(f"Erreur lors du chargement de l'image : {e}")
+
+    async def _fetch_images(self, search_id, items):
+        # Toutes les images partent en meme temps ; chacune est rendue des son arrivee
+        tasks = [asyncio.ensure_future(self._fetch_image_indexed(idx, url) if url else _no_image(idx))
+                 for idx, url in items]
+        try:
+            for next_image in asyncio.as_completed(tasks):
+                idx, key, img = await next_image
+                self.post(("image", search_id, idx, key, img))
+        finally:
+            # Recherche remplacee : abandonner les images qui restent
+            for task in tasks:
+                task.cancel()
+
+    def close(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=1)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._image_executor.shutdown(wait=False, cancel_futures=True)
+        self._image_pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def _no_image(idx):
+    return idx, None, None
+
@@ -0,0 +1,50 @@
+import asyncio
+import collections
+import time
+
+
+class LatencyTracker(object):
+    # Fenetre glissante des dernieres durees mesurees, pour estimer le p95
+    def __init__(self, window, min_samples):
+        self.min_samples = min_samples
+        self._samples = collections.deque(maxlen=window)
+
+    def record(self, seconds):
+        self._samples.append(seconds)
+
+    def percentile(self, fraction):
+        # None tant qu'il n'y a pas assez de mesures pour que ce soit fiable
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def hedged(coro_factory, tracker, fraction=0.95):
+    # Lance une tentative ; si elle depasse le percentile observe, en lance une
+    # seconde et garde la premiere qui reussit. Seule la coroutine de la perdante est
+    # annulee : un appel bloquant deja parti dans un thread va jusqu'au bout (ou
+    # jusqu'a son timeout) et son resultat est ignore. Le moteur garde donc ces
+    # appels dans un pool de threads a part.
+    started = time.monotonic()
+    delay = tracker.percentile(fraction)
+    first = asyncio.ensure_future(coro_factory())
+    attempts = [first]
+    try:
+        if delay is not None:
+            done, _ = await asyncio.wait(attempts, timeout=delay)
+            if not done:
+                attempts.append(asyncio.ensure_future(coro_factory()))
+        pending = set(attempts)
+        while True:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for attempt in done:
+                if attempt.exception() is None:
+                    tracker.record(time.monotonic() - started)
+                    return attempt.result()
+            if not pending:
+                # Toutes les tentatives ont echoue : on remonte l'erreur de la premiere
+                return first.result()
+    finally:
+        for attempt in attempts:
+            attempt.cancel()
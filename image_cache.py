@@ -0,0 +1,135 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import config
+from thumbnails import read_image_response
+
+
+class ImageStore(object):
+    # Cache disque des images de recettes. Le contenu est range par empreinte
+    # (sha256), l'index sqlite relie chaque URL a son empreinte et a ses en-tetes
+    # ETag / Last-Modified. Les images perimees sont revalidees par une requete
+    # conditionnelle, et les moins recemment lues sont supprimees au-dela du budget.
+    def __init__(self, session, directory=None, max_bytes=None, max_age=None):
+        self.session = session
+        self.directory = directory or os.path.join(config.CACHE_DIR, "images")
+        self.max_bytes = config.IMAGE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.max_age = config.IMAGE_CACHE_MAX_AGE if max_age is None else max_age
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(self.directory, "index.sqlite3"), check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS images ("
+                         "url TEXT PRIMARY KEY, hash TEXT, size INTEGER, etag TEXT, last_modified TEXT, "
+                         "fetched REAL, accessed REAL)")
+        self._db.commit()
+
+    def get_fresh(self, url):
+        # Contenu en cache s'il est encore frais (pas de reseau), sinon None
+        entry = self._lookup(url)
+        if entry is None or time.time() - entry[3] >= self.max_age:
+            return None
+        data = self._read_blob(entry[0])
+        if data is not None:
+            self._touch(url)
+        return data
+
+    def fetch(self, url, **kwargs):
+        # Renvoie le contenu de l'image, depuis le disque si possible
+        entry = self._lookup(url)
+        data = self._read_blob(entry[0]) if entry else None
+        if data is None:
+            return self._download(url, {}, **kwargs)
+        digest, etag, last_modified, fetched = entry
+        if time.time() - fetched < self.max_age:
+            self._touch(url)
+            return data
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        try:
+            return self._download(url, headers, cached=data, **kwargs)
+        except Exception as e:
+            # Hors ligne : une image perimee vaut mieux que pas d'image
+            print(f"Revalidation impossible pour {url} : {e}")
+            self._touch(url)
+            return data
+
+    def _download(self, url, headers, cached=None, **kwargs):
+        response = self.session.get(url, headers=headers, stream=True, **kwargs)
+        now = time.time()
+        if response.status_code == 304 and cached is not None:
+            response.close()
+            with self._lock:
+                self._db.execute("UPDATE images SET fetched = ?, accessed = ? WHERE url = ?", (now, now, url))
+                self._db.commit()
+            return cached
+        if response.status_code >= 400:
+            response.close()
+            response.raise_for_status()
+        # Lecture par morceaux, plafonnee, avec abandon precoce sur l'en-tete
+        data = read_image_response(response)
+        self._store(url, data, response.headers.get('ETag'), response.headers.get('Last-Modified'), now)
+        return data
+
+    def _lookup(self, url):
+        with self._lock:
+            return self._db.execute("SELECT hash, etag, last_modified, fetched FROM images WHERE url = ?",
+                                    (url,)).fetchone()
+
+    def _touch(self, url):
+        with self._lock:
+            self._db.execute("UPDATE images SET accessed = ? WHERE url = ?", (time.time(), url))
+            self._db.commit()
+
+    def _blob_path(self, digest):
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def _read_blob(self, digest):
+        try:
+            with open(self._blob_path(digest), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _store(self, url, data, etag, last_modified, now):
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        # Meme contenu sous plusieurs URL : un seul fichier
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + ".%d.tmp" % threading.get_ident()
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             (url, digest, len(data), etag, last_modified, now, now))
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM "
+                                 "(SELECT hash, MAX(size) AS size FROM images GROUP BY hash)").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute("SELECT url, hash, size FROM images ORDER BY accessed").fetchall()
+        for url, digest, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM images WHERE url = ?", (url,))
+            still_used = self._db.execute("SELECT 1 FROM images WHERE hash = ? LIMIT 1", (digest,)).fetchone()
+            if not still_used:
+                try:
+                    os.remove(self._blob_path(digest))
+                except OSError:
+                    pass
+                total -= size
+
+    def close(self):
+        with self._lock:
+            self._db.close()
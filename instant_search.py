@@ -0,0 +1,75 @@
+import bisect
+from collections import OrderedDict
+
+import config
+from response_cache import canonical_ingredients
+
+# Listes d'ingredients d'une reponse de findByIngredients
+INGREDIENT_FIELDS = ('usedIngredients', 'missedIngredients', 'unusedIngredients')
+
+
+class InstantResults(object):
+    # Recettes deja recues de l'API pendant la session, indexees par nom d'ingredient,
+    # pour repondre pendant la frappe sans reseau : chaque mot tape (le dernier etant
+    # peut-etre incomplet) doit etre le debut d'un ingredient de la recette.
+    def __init__(self, max_recipes=None):
+        self.max_recipes = config.INSTANT_MAX_RECIPES if max_recipes is None else max_recipes
+        self._recipes = OrderedDict()
+        self._by_name = {}
+        self._names = []
+
+    def add(self, recipes):
+        for recipe in recipes or []:
+            recipe_id = recipe.get('id', recipe.get('title'))
+            if recipe_id in self._recipes:
+                self._recipes.move_to_end(recipe_id)
+                continue
+            self._recipes[recipe_id] = recipe
+            for name in _ingredient_names(recipe):
+                if name not in self._by_name:
+                    self._by_name[name] = set()
+                    bisect.insort(self._names, name)
+                self._by_name[name].add(recipe_id)
+        while len(self._recipes) > self.max_recipes:
+            self._forget(*self._recipes.popitem(last=False))
+
+    def lookup(self, text, limit=None):
+        prefixes = canonical_ingredients(text.split(','))
+        if not prefixes:
+            return []
+        matches = None
+        for prefix in prefixes:
+            ids = self._with_prefix(prefix)
+            matches = ids if matches is None else matches & ids
+            if not matches:
+                return []
+        # Comme l'API : le plus d'ingredients utilises, puis le moins d'ingredients manquants
+        recipes = sorted((self._recipes[recipe_id] for recipe_id in matches),
+                         key=lambda recipe: (-recipe.get('usedIngredientCount', 0),
+                                             recipe.get('missedIngredientCount', 0)))
+        return recipes[:config.SEARCH_PAGE_SIZE if limit is None else limit]
+
+    def _with_prefix(self, prefix):
+        ids = set()
+        start = bisect.bisect_left(self._names, prefix)
+        for name in self._names[start:]:
+            if not name.startswith(prefix):
+                break
+            ids |= self._by_name[name]
+        return ids
+
+    def _forget(self, recipe_id, recipe):
+        for name in _ingredient_names(recipe):
+            ids = self._by_name.get(name)
+            if ids is None:
+                continue
+            ids.discard(recipe_id)
+            if not ids:
+                del self._by_name[name]
+                del self._names[bisect.bisect_left(self._names, name)]
+
+
+def _ingredient_names(recipe):
+    return {ingredient.get('name', '').strip().lower()
+            for field in INGREDIENT_FIELDS for ingredient in recipe.get(field) or []
+            if ingredient.get('name')}
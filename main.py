@@ -1,11 +1,16 @@
-from io import BytesIO
-from PIL import Image, ImageTk
+from PIL import ImageTk
 #from playsound import playsound
 from py_edamam import PyEdamam, Recipe
-import requests
 import tkinter as tk
 import webbrowser
 
+import config
+from image_cache import ImageStore
+from rate_limit import RateLimiter
+from result_set import ResultSet
+from session import HttpSession
+from thumbnails import make_thumbnail
+
 #BUTTON_CLICK_SOUND = "../clicks.m4a"
 WINDOW_TITLE = "Recipe App"
 RECIPE_IMAGE_WIDTH = 350
@@ -17,6 +22,11 @@ class RecipeApp(object):
     def __init__(self, recipe_app_id, recipe_app_key ):
         self.recipe_app_id = recipe_app_id
         self.recipe_app_key = recipe_app_key
+        self.session = HttpSession()
+        # Les images passent par le cache disque : une image deja vue n'est pas retelechargee
+        self.image_store = ImageStore(self.session)
+        # Limite Edamam (requetes par minute) : les recherches trop rapprochees sont differees
+        self.rate_limiter = RateLimiter()
         self.window = tk.Tk()
         self.window.geometry("") # aura dimontionner automatiquement ()
         self.window.configure(bg="#FDF7E4")
@@ -31,6 +41,9 @@ class RecipeApp(object):
         self.search_button = tk.Button(self.window, text="search", highlightbackground="#ea86b6", command=self.__run_search_query)
         self.search_button.grid(column=2, row=0, padx=5)
 
+        # Widgets du resultat affiche (texte, image, lien), remplaces a chaque recherche
+        self.results = ResultSet()
+
 # creer la fonction qui exicute la recherche
     def __run_search_query(self):#, reipeName):
         #pass # pass is a null operation — when it is executed, nothing happens.
@@ -38,21 +51,43 @@ class RecipeApp(object):
         # __ : dans python signifie qu'une fonction prive
         #playsound(BUTTON_CLICK_SOUND)
         query = self.search_entry.get()
-        recipe = self.__get_recipe(query)
+        self.__search_when_allowed(query, 0)
+
+    def __search_when_allowed(self, query, attempt):
+        # Respecter la limite Edamam sans bloquer la fenetre : la recherche est differee si besoin
+        delay = self.rate_limiter.reserve("edamam")
+        if delay > 0:
+            self.window.after(int(delay * 1000), lambda: self.__search_edamam(query, attempt))
+        else:
+            self.__search_edamam(query, attempt)
+
+    def __search_edamam(self, query, attempt):
+        try:
+            recipe = self.__get_recipe(query)
+        except Exception as e:
+            # Refus (limite depassee, erreur serveur...) : on recule puis on reessaie
+            if attempt < config.RATE_LIMIT_MAX_RETRIES:
+                delay = self.rate_limiter.backoff("edamam", attempt)
+                print(f"Edamam indisponible ({e}), nouvel essai dans {delay:.1f} s")
+                self.__search_when_allowed(query, attempt + 1)
+                return
+            recipe = None
         if recipe:
             recipe_image = recipe.image
             recipe_url = recipe.url
         else:
-            # Recipe not found
-            recipe_image = "https://www.mageworx.com/blog/wp-content/uploads/2012/06/Page-Not-Found-13.jpg"
+            # Recipe not found : image de secours locale
+            recipe_image = None
             recipe_url = ""
+        self.results.release()
+        self.results = ResultSet()
         self.__show_image(recipe_image)
         self.__get_ingredients(recipe)
         def __open_link():
             #playsound(BUTTON_CLICK_SOUND)
             webbrowser.open(recipe_url)
-        self.recipe_button = tk.Button(self.window, text="recipe link", highlightbackground="#ea86b6",
-                                       command=__open_link)
+        self.recipe_button = self.results.add(tk.Button(self.window, text="recipe link", highlightbackground="#ea86b6",
+                                                        command=__open_link))
         self.recipe_button.grid(column=1, row=7, pady=10)
 
 
@@ -83,17 +118,20 @@ class RecipeApp(object):
 
 
     def __show_image(self,image_url):
-        response = requests.get(image_url)
-        img = Image.open(BytesIO(response.content))
-        img = img.resize((RECIPE_IMAGE_WIDTH, RECIPE_IMAGE_HEIGHT))
-        image = ImageTk.PhotoImage(img)
-        holder = tk.Label(self.window, image=image)
+        if image_url:
+            source = self.image_store.fetch(image_url, timeout=config.IMAGE_TIMEOUT)
+        else:
+            source = config.DEFAULT_IMAGE_PATH
+        # Decodage directement a la taille d'affichage
+        img = make_thumbnail(source, (RECIPE_IMAGE_WIDTH, RECIPE_IMAGE_HEIGHT), exact=True)
+        image = self.results.add_image(ImageTk.PhotoImage(img))
+        holder = self.results.add(tk.Label(self.window, image=image))
         holder.photo = image
         holder.grid(column=1, row=6, pady=10)
 
 
     def __get_ingredients(self,recipe):
-        ingredients = tk.Text(master=self.window, height=15, width=50, bg="#ffdada")
+        ingredients = self.results.add(tk.Text(master=self.window, height=15, width=50, bg="#ffdada"))
         ingredients.grid(column=1, row=4, pady=10)
         ingredients.delete("1.0", tk.END)
         if recipe == None:
@@ -105,6 +143,8 @@ class RecipeApp(object):
 
     def run_app(self):
         self.window.mainloop()
+        self.image_store.close()
+        self.session.close()
         return
 
 
@@ -0,0 +1,79 @@
+import collections
+import threading
+
+import config
+
+
+class _LruTier(object):
+    # Un niveau du cache : LRU borne en octets
+    def __init__(self, budget):
+        self.budget = budget
+        self.used = 0
+        self._items = collections.OrderedDict()
+
+    def get(self, key):
+        entry = self._items.get(key)
+        if entry is None:
+            return None
+        self._items.move_to_end(key)
+        return entry[0]
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def put(self, key, value, cost):
+        if cost > self.budget:
+            return
+        old = self._items.pop(key, None)
+        if old is not None:
+            self.used -= old[1]
+        self._items[key] = (value, cost)
+        self.used += cost
+        while self.used > self.budget:
+            _, (_, evicted_cost) = self._items.popitem(last=False)
+            self.used -= evicted_cost
+
+
+class TieredImageCache(object):
+    # Cache memoire des vignettes a trois niveaux, chacun LRU et borne en octets :
+    #   1. PhotoImage Tk prets a afficher, cle (url, taille, bord) -- thread Tk uniquement
+    #   2. images PIL decodees a la taille d'affichage, meme cle
+    #   3. octets compresses telecharges, cle url
+    # Revenir sur une page recente ne demande ainsi ni decodage ni reseau.
+    def __init__(self, budget=None, shares=None):
+        budget = config.IMAGE_MEMORY_BUDGET if budget is None else budget
+        shares = config.IMAGE_MEMORY_TIER_SHARES if shares is None else shares
+        self._lock = threading.Lock()
+        self._photos, self._images, self._bytes = (_LruTier(int(budget * share)) for share in shares)
+
+    def get_photo(self, key):
+        with self._lock:
+            return self._photos.get(key)
+
+    def has_photo(self, key):
+        with self._lock:
+            return key in self._photos
+
+    def put_photo(self, key, photo):
+        with self._lock:
+            self._photos.put(key, photo, photo.width() * photo.height() * 4)
+
+    def get_image(self, key):
+        with self._lock:
+            return self._images.get(key)
+
+    def put_image(self, key, img):
+        with self._lock:
+            self._images.put(key, img, img.width * img.height * len(img.getbands()))
+
+    def get_bytes(self, url):
+        with self._lock:
+            return self._bytes.get(url)
+
+    def put_bytes(self, url, data):
+        with self._lock:
+            self._bytes.put(url, data, len(data))
+
+    def used(self):
+        with self._lock:
+            return self._photos.used + self._images.used + self._bytes.used
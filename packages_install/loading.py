@@ -1,25 +1,52 @@
-import random
-import string
-from io import BytesIO
-from PIL import Image, ImageTk, ImageOps
-import requests
+import os
+import sys
+from PIL import ImageTk
 import tkinter as tk
 import tkinter.ttk as ttk
-import threading
+
+# Les modules partages (moteur, session HTTP, reglages) sont a la racine du projet
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from engine import SearchEngine
+from image_cache import ImageStore
+from memory_cache import TieredImageCache
+from response_cache import ResponseCache
+from result_set import ResultSet
+from row_pool import RowPool, reconfigure
+from session import HttpSession
+from thumbnails import make_thumbnail
+from ui_dispatcher import UiDispatcher
 
 WINDOW_TITLE = "Recipe App"
 RECIPE_IMAGE_WIDTH = 150
 RECIPE_IMAGE_HEIGHT = 150
-DEFAULT_IMAGE_URL = "https://www.mageworx.com/blog/wp-content/uploads/2012/06/Page-Not-Found-13.jpg"
+RECIPE_IMAGE_BORDER = 10
 
 
 class RecipeApp(object):
     def __init__(self, api_key):
         self.api_key = api_key
+        self.session = HttpSession()
+        # Cache disque des reponses de l'API (cle normalisee, duree de validite)
+        self.response_cache = ResponseCache()
+        # Cache disque des images (par empreinte, LRU, revalidation ETag/Last-Modified)
+        self.image_store = ImageStore(self.session)
+        # Cache memoire (PhotoImage, PIL, octets) pour revenir sur une page sans rien refaire
+        self.memory_cache = TieredImageCache()
+        # Moteur asyncio (thread de fond) pour la recherche et les images
+        self.engine = SearchEngine(self.session, api_key, (RECIPE_IMAGE_WIDTH, RECIPE_IMAGE_HEIGHT),
+                                   RECIPE_IMAGE_BORDER, self.response_cache, self.image_store,
+                                   memory_cache=self.memory_cache, post=self._post_engine_event)
+        self.recettes = {}
+        # Jeton de la recherche la plus recente ; les resultats des autres sont ignores
+        self._search_generation = None
         self.window = tk.Tk()
         self.window.geometry("")
         self.window.configure(bg="#FDF7E4")
         self.window.title(WINDOW_TITLE)
+        # Mises a jour postees par le moteur, appliquees par lots une fois par frame
+        self.dispatcher = UiDispatcher(self.window, keep_alive=self.engine.busy)
 
         self.waiting_label = tk.Label(self.window, text="", font=("Times New Roman", 14, "bold"))
         self.waiting_label.grid(row=2, column=0, columnspan=3, pady=10, sticky="nsew")
@@ -54,9 +81,16 @@ class RecipeApp(object):
         # Create a vertical scrollbar linked to the canvas
         self.scrollbar = tk.Scrollbar(self.window, orient="vertical", command=self.canvas.yview)
         self.scrollbar.grid(row=1, column=3, sticky="ns")
+        self.result_frame.grid_columnconfigure(0, weight=1)
         self.result_frame.grid_columnconfigure(3, weight=1)
+        # Widgets et images des resultats affiches, liberes a la recherche suivante
+        self.results = ResultSet()
+        # Lignes (titre, vignette, ingredients) reutilisees d'une recherche a l'autre
+        self.pool = RowPool(self.result_frame, self._creer_ligne)
 
-        self.default_image = Image.open(BytesIO(requests.get(DEFAULT_IMAGE_URL).content))
+        self._default_image = None
+        self._mise_en_page = None
+        self._placeholder_image = None
 
         # Set row and column weights to allow expansion
         self.window.grid_rowconfigure(1, weight=1)
@@ -64,6 +98,15 @@ class RecipeApp(object):
         self.window.grid_columnconfigure(1, weight=1)
         self.window.grid_columnconfigure(2, weight=1)
 
+    @property
+    def default_image(self):
+        # Image de secours lue sur le disque (deja a la taille des vignettes, avec bord),
+        # et seulement la premiere fois qu'on en a besoin
+        if self._default_image is None:
+            self._default_image = make_thumbnail(config.DEFAULT_IMAGE_PATH, (RECIPE_IMAGE_WIDTH, RECIPE_IMAGE_HEIGHT),
+                                                 RECIPE_IMAGE_BORDER)
+        return self._default_image
+
     def _run_search_query(self):
         query = self.search_entry.get()
 
@@ -73,114 +116,146 @@ class RecipeApp(object):
         # Centrez le label avec grid
         self.waiting_label.grid(row=2, column=0, columnspan=3, pady=10, sticky="nsew")
 
-        # Run the search query in a separate thread
-        search_thread = threading.Thread(target=self._run_search_query_background)
-        search_thread.start()
-        recipes = self.trouver_recette([query])
-        if recipes:
-            self.afficher_recettes(recipes)
+        # Start the progress bar
+        self.pb.start(25)
+
+        # La recherche tourne sur la boucle du moteur ; ses evenements passent par le dispatcher
+        self._search_generation = self.engine.search([query])
+        self.dispatcher.wake()
 
     def _update_gui(self, recipes):
         # Masquez le message d'attente
         self.waiting_label.config(text="")
-        # Display the recipes
-        if recipes:
-            self.afficher_recettes(recipes)
 
         # Stop the progress bar
         self.pb.stop()
         # Affichez la fenêtre principale après le chargement
         self.window.deiconify()
 
-    def _run_search_query_background(self):
-        # Start the progress bar
-        self.pb.start(25)
-
-        recipes = self.trouver_recette([self.search_entry.get()])
-        self.window.after(0, lambda: self._update_gui(recipes))
+    def _post_engine_event(self, event):
+        # Appele dans le thread du moteur : rien ne touche Tk ici. Dans une meme frame, les
+        # "recipes" successifs et les images d'une meme ligne se remplacent.
+        kind = event[0]
+        if kind == "recipes":
+            key = "recipes"
+        elif kind == "image":
+            key = ("image", event[1], event[2])
+        else:
+            key = None
+        self.dispatcher.post(self._handle_engine_event, event, key=key)
+
+    def _handle_engine_event(self, event):
+        kind, search_id = event[0], event[1]
+        if search_id != self._search_generation:
+            # Recherche remplacee par une plus recente : rien a afficher
+            self.recettes.pop(search_id, None)
+            return
+        if kind == "recipes":
+            self.recettes[search_id] = event[2]
+            self.afficher_recettes(event[2])
+        elif kind == "image":
+            idx, key, img = event[2], event[3], event[4]
+            self._afficher_image(idx, self._photo_for(key, img))
+        elif kind == "done":
+            self.recettes.pop(search_id, None)
+            self._update_gui(event[2])
 
     def trouver_recette(self, ingredients):
-        base_url = 'https://api.spoonacular.com/recipes/findByIngredients'
-        ingr_string = ','.join(ingredients)
-        params = {
-            'ingredients': ingr_string,
-            'apiKey': self.api_key,
-            'number': 6,
-            'random': ''.join(random.choices(string.ascii_lowercase + string.digits, k=8))
-            # Append a random query string
-        }
-        response = requests.get(base_url, params=params)
-        if response.status_code == 200:
-            recettes = response.json()
-            return recettes
-        else:
-            return None
+        # Appel synchrone (sans interface) au moteur
+        return self.engine.run(self.engine.find_recipes(ingredients))
 
     def afficher_recettes(self, recettes):
+        # Les resultats precedents (widgets, images) sont liberes avant d'afficher
+        self.results.release()
+        self.results = ResultSet()
         if recettes:
+            # Titres et ingredients tout de suite, avec une vignette d'attente ; le moteur
+            # a deja lance les telechargements et chaque image remplace la sienne
+            # (_afficher_image) des son arrivee, dans n'importe quel ordre.
             print("Recettes trouvées:")
             for idx, recette in enumerate(recettes):
-                title = recette.get('title')
-                title_label = tk.Label(self.result_frame, text=title, bg="#ffffff",
-                                       font=("Times New Roman", 14, "bold"))
-                title_label.grid(row=idx, column=0, sticky='w', ipadx=10, ipady=10)
-
-                image_url = recette.get('image')
-                try:
-                    response = requests.get(image_url)
-                    img = Image.open(BytesIO(response.content))
-                    border_size = 10
-                    img_with_border = ImageOps.expand(img, border=border_size, fill='gray')
-
-                except Exception as e:
-                    print(f"Erreur lors du chargement de l'image : {e}")
-                    img_with_border = self.default_image
-
-                img = img.resize((RECIPE_IMAGE_WIDTH * 2, RECIPE_IMAGE_HEIGHT * 2))
-                photo = ImageTk.PhotoImage(img_with_border)
-                img_label = tk.Label(self.result_frame, image=photo, bg="#ffffff")
-                img_label.image = photo
-                img_label.grid(row=idx, column=1, sticky='nsew', ipadx=10, ipady=10)
-
-                missed_ingredient_count = recette.get('missedIngredientCount')
-                missing_ingredients = recette.get('missedIngredients')
-                if missed_ingredient_count:
-                    info_text = f"Missing Ingredients: {missed_ingredient_count}\n"
-                    for ingredient in missing_ingredients:
-                        info_text += f"- {ingredient.get('name')}\n"
-                    info_label = tk.Label(self.result_frame, text=info_text, bg="#ffffff", justify='left',
-                                          font=("Times New Roman", 14, "bold"))
-                    info_label.grid(row=idx, column=2, sticky='w', ipadx=10,
-                                    ipady=10)  # Ajoutez ipadx et ipady pour le centrage
-
-                title_label.configure(bg="#ffffff")
-                img_label.configure(bg="#ffffff")
-
-                # Set row weights for the result_frame to allow expansion
-                self.result_frame.grid_rowconfigure(idx, weight=1)
-                self.result_frame.grid_rowconfigure(idx + 1, weight=1)
-                self.result_frame.grid_rowconfigure(idx + 2, weight=1)
-
-            # Set row weights for the result_frame to allow expansion
-            # self.result_frame.grid_rowconfigure(idx, weight=1)
-
-            # Set column weights for the result_frame to allow expansion
-            self.result_frame.grid_columnconfigure(0, weight=1)
-            self.result_frame.grid_columnconfigure(1, weight=1)
-            self.result_frame.grid_columnconfigure(2, weight=1)
-            self.result_frame.grid_columnconfigure(3, weight=1)
-
-            info_label.configure(bg="#ffffff")
-            self.canvas.update_idletasks()
-            self.canvas.config(scrollregion=self.canvas.bbox("all"))
-
-
-
+                self._afficher_recette(idx, recette)
         else:
             print("Aucune recette trouvée.")
+        self._invalider_mise_en_page()
+
+    def _photo_for(self, key, img):
+        # PhotoImage deja construit pour cette vignette, sinon on le cree et le garde
+        photo = self.memory_cache.get_photo(key) if key else None
+        if photo is None:
+            photo = ImageTk.PhotoImage(img if img is not None else self.default_image)
+            if img is not None:
+                self.memory_cache.put_photo(key, photo)
+        return photo
+
+    @property
+    def placeholder_image(self):
+        # Vignette d'attente unie, creee une seule fois (sans PIL)
+        if self._placeholder_image is None:
+            width = RECIPE_IMAGE_WIDTH + 2 * RECIPE_IMAGE_BORDER
+            height = RECIPE_IMAGE_HEIGHT + 2 * RECIPE_IMAGE_BORDER
+            self._placeholder_image = tk.PhotoImage(width=width, height=height)
+            self._placeholder_image.put("#e0e0e0", to=(0, 0, width, height))
+        return self._placeholder_image
+
+    def _afficher_image(self, idx, photo):
+        img_label = self.results.image_labels.get(idx)
+        if img_label is not None:
+            # reconfigure garde l'image affichee a jour pour la reutilisation de la ligne
+            reconfigure(img_label, image=photo)
+            img_label.image = photo
+
+    def _creer_ligne(self, parent):
+        row = tk.Frame(parent, bg="#ffffff")
+        row.title_label = tk.Label(row, bg="#ffffff", font=("Times New Roman", 14, "bold"))
+        row.title_label.grid(row=0, column=0, sticky='w', ipadx=10, ipady=10)
+        row.img_label = tk.Label(row, bg="#ffffff")
+        row.img_label.grid(row=0, column=1, sticky='nsew', ipadx=10, ipady=10)
+        row.info_label = tk.Label(row, bg="#ffffff", justify='left', font=("Times New Roman", 14, "bold"))
+        row.info_label.grid(row=0, column=2, sticky='w', ipadx=10,
+                            ipady=10)  # Ajoutez ipadx et ipady pour le centrage
+        row.grid_columnconfigure(0, weight=1)
+        row.grid_columnconfigure(1, weight=1)
+        row.grid_columnconfigure(2, weight=1)
+        return row
+
+    def _afficher_recette(self, idx, recette):
+        # Ligne reprise dans la reserve (creee seulement si elle est vide), reconfiguree sur place
+        row = self.results.add_row(self.pool, self.pool.acquire())
+        reconfigure(row.title_label, text=recette.get('title'))
+
+        photo = self.placeholder_image
+        reconfigure(row.img_label, image=photo)
+        row.img_label.image = photo
+        self.results.image_labels[idx] = row.img_label
+
+        missed_ingredient_count = recette.get('missedIngredientCount')
+        missing_ingredients = recette.get('missedIngredients')
+        info_text = ""
+        if missed_ingredient_count:
+            info_text = f"Missing Ingredients: {missed_ingredient_count}\n"
+            for ingredient in missing_ingredients:
+                info_text += f"- {ingredient.get('name')}\n"
+        reconfigure(row.info_label, text=info_text)
+        row.grid(row=idx, column=0, columnspan=4, sticky='nsew')
+
+    def _invalider_mise_en_page(self):
+        # Mise en page differee : une page entiere de lignes ne declenche qu'une passe
+        if self._mise_en_page is None:
+            self._mise_en_page = self.window.after_idle(self._mettre_en_page)
+
+    def _mettre_en_page(self):
+        self._mise_en_page = None
+        # Une seule passe de geometrie, puis la zone de defilement d'apres la taille finale
+        self.canvas.update_idletasks()
+        self.canvas.config(scrollregion=self.canvas.bbox("all"))
 
     def run_app(self):
         self.window.mainloop()
+        self.engine.close()
+        self.response_cache.close()
+        self.image_store.close()
+        self.session.close()
 
 
 if __name__ == "__main__":
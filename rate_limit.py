@@ -0,0 +1,113 @@
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+
+import config
+
+
+def spoonacular_cost(number):
+    # Cout en points d'un appel findByIngredients renvoyant `number` recettes
+    return 1 + 0.01 * number
+
+
+class QuotaExhausted(Exception):
+    # L'attente avant le prochain envoi depasserait le delai maximal accepte
+    def __init__(self, delay):
+        super().__init__(f"Quota epuise, prochain envoi possible dans {delay:.0f} s")
+        self.delay = delay
+
+
+class TokenBucket(object):
+    # Seau a jetons avec reservation : chaque appel retire son cout tout de suite
+    # (le solde peut devenir negatif) et recoit le delai a attendre avant d'envoyer
+    # la requete. Les demandes sont ainsi servies dans l'ordre, sans rejet.
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        # Backoff ou quota epuise : aucune requete avant cette date (monotonic)
+        self.blocked_until = 0.0
+
+    def reserve(self, cost, now, max_wait=None):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= cost
+        delay = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        delay = max(delay, self.blocked_until - now)
+        if max_wait is not None and delay > max_wait:
+            # Trop long : la reservation est annulee
+            self.tokens += cost
+            raise QuotaExhausted(delay)
+        return delay
+
+
+class RateLimiter(object):
+    # Ordonnanceur partage : un seau par fournisseur, mis a jour d'apres les en-tetes
+    # de quota des reponses, et backoff exponentiel avec gigue apres un 429 / 5xx.
+    def __init__(self, limits=None):
+        limits = config.RATE_LIMITS if limits is None else limits
+        self._lock = threading.Lock()
+        self._buckets = {name: TokenBucket(rate, burst) for name, (rate, burst) in limits.items()}
+
+    def reserve(self, provider, cost=1, max_wait=None):
+        # Reserve `cost` points et renvoie le delai (secondes) a respecter avant l'envoi ;
+        # QuotaExhausted (sans rien reserver) si ce delai depasse max_wait
+        with self._lock:
+            return self._buckets[provider].reserve(cost, time.monotonic(), max_wait)
+
+    def wait(self, provider, cost=1):
+        time.sleep(self.reserve(provider, cost))
+
+    def block(self, provider, seconds):
+        with self._lock:
+            bucket = self._buckets[provider]
+            bucket.blocked_until = max(bucket.blocked_until, time.monotonic() + seconds)
+
+    def backoff(self, provider, attempt, retry_after=None):
+        # Apres un refus : Retry-After s'il est fourni, sinon 2^attempt * base avec gigue
+        delay = _parse_retry_after(retry_after)
+        if delay is None:
+            ceiling = min(config.RATE_LIMIT_BACKOFF_MAX, config.RATE_LIMIT_BACKOFF_BASE * 2 ** attempt)
+            delay = random.uniform(ceiling / 2, ceiling)
+        self.block(provider, delay)
+        return delay
+
+    def update_from_headers(self, provider, headers):
+        # Quota journalier Spoonacular (en points), remis a zero a minuit UTC
+        quota_left = _to_float(headers.get('X-API-Quota-Left'))
+        if quota_left is not None and quota_left <= 0:
+            now = datetime.now(timezone.utc)
+            midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+            self.block(provider, (midnight - now).total_seconds())
+        # En-tetes X-RateLimit-* generiques
+        remaining = _to_float(headers.get('X-RateLimit-Remaining'))
+        reset = _to_float(headers.get('X-RateLimit-Reset'))
+        if remaining is not None and remaining <= 0 and reset is not None:
+            # Reset donne soit en secondes, soit en horodatage epoch
+            self.block(provider, reset - time.time() if reset > 1e9 else reset)
+
+
+def is_retryable(status_code):
+    return status_code == 429 or status_code >= 500
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_retry_after(value):
+    if value is None:
+        return None
+    seconds = _to_float(value)
+    if seconds is not None:
+        return max(0.0, seconds)
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
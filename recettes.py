@@ -1,24 +1,79 @@
-import random
-import string
-from io import BytesIO
-from PIL import Image, ImageTk, ImageOps
-import requests
+from PIL import ImageTk
 import tkinter as tk
-import threading
+
+import config
+from animation import Animation
+from atlas import ThumbnailAtlas
+from engine import SearchEngine
+from image_cache import ImageStore
+from instant_search import InstantResults
+from memory_cache import TieredImageCache
+from recipe_corpus import RecipeCorpus
+from response_cache import ResponseCache
+from result_set import ResultSet
+from row_pool import RowPool, reconfigure
+from session import HttpSession
+from thumbnails import make_thumbnail
+from ui_dispatcher import UiDispatcher
+from virtual_list import VirtualList
 
 WINDOW_TITLE = "Recipe App"
 RECIPE_IMAGE_WIDTH = 150
 RECIPE_IMAGE_HEIGHT = 150
-DEFAULT_IMAGE_URL = "https://www.mageworx.com/blog/wp-content/uploads/2012/06/Page-Not-Found-13.jpg"
+RECIPE_IMAGE_BORDER = 10
+# Hauteur fixe d'une ligne de resultat (vignette avec bord + marge)
+ROW_HEIGHT = RECIPE_IMAGE_HEIGHT + 2 * RECIPE_IMAGE_BORDER + 20
+# Ingredients manquants listes par ligne, le reste resume en "+N more" : l'en-tete et
+# ces lignes (14 pt, ~22 px chacune, + ipady) tiennent dans ROW_HEIGHT
+MISSING_INGREDIENTS_MAX_LINES = 5
+# Mise en page du mode atlas
+ATLAS_TITLE_WIDTH = 300
+ATLAS_ROW_PADDING = 20
+# Periode (ms) du clignotement du message de chargement
+LOADING_BLINK_MS = 500
 
 
 class RecipeApp(object):
-    def __init__(self, api_key):
+    def __init__(self, api_key, atlas=None):
         self.api_key = api_key
+        # Mode atlas : une page de resultats = un seul item image sur le Canvas
+        self.atlas_mode = config.RESULTS_ATLAS if atlas is None else atlas
+        # Session HTTP partagee (keep-alive) pour l'API et les images
+        self.session = HttpSession()
+        # Cache disque des reponses de l'API (cle normalisee, duree de validite)
+        self.response_cache = ResponseCache()
+        # Cache disque des images (par empreinte, LRU, revalidation ETag/Last-Modified)
+        self.image_store = ImageStore(self.session)
+        # Cache memoire (PhotoImage, PIL, octets) pour revenir sur une page sans rien refaire
+        self.memory_cache = TieredImageCache()
+        # Corpus local de recettes (index inverse par ingredient), enrichi par l'API
+        self.corpus = RecipeCorpus()
+        # Moteur asyncio (thread de fond) pour la recherche et les images
+        self.engine = SearchEngine(self.session, api_key, (RECIPE_IMAGE_WIDTH, RECIPE_IMAGE_HEIGHT),
+                                   RECIPE_IMAGE_BORDER, self.response_cache, self.image_store,
+                                   memory_cache=self.memory_cache, post=self._post_engine_event,
+                                   corpus=self.corpus)
+        self.recettes = {}
+        # Jeton de la recherche la plus recente ; les resultats des autres sont ignores
+        self._search_generation = None
+        # Recettes affichees, cle de vignette par ligne (None = pas d'image) et lignes
+        # dont la vignette a deja ete demandee au moteur
+        self._recettes_affichees = []
+        self._vignettes = {}
+        self._vignettes_demandees = set()
+        # Pagination : ingredients de la recherche affichee, derniere page recue, et
+        # page suivante deja demandee ou non
+        self._ingredients = []
+        self._page = 0
+        self._plus_de_pages = False
+        self._page_demandee = False
+        self._quota_epuise = False
         self.window = tk.Tk()
         self.window.geometry("")
         self.window.configure(bg="#FDF7E4")
         self.window.title(WINDOW_TITLE)
+        # Mises a jour postees par le moteur, appliquees par lots une fois par frame
+        self.dispatcher = UiDispatcher(self.window, keep_alive=self.engine.busy)
 
         self.waiting_label = tk.Label(self.window, text="", font=("Times New Roman", 14, "bold"))
         self.waiting_label.grid(row=2, column=0, columnspan=3, pady=10, sticky="nsew")
@@ -40,21 +95,32 @@ class RecipeApp(object):
         self.canvas = tk.Canvas(self.window)
         self.canvas.grid(row=1, column=0, columnspan=3, padx=10, pady=10, sticky="nsew")
 
-        # Create a frame inside the canvas to hold the content
-        self.result_frame = tk.Frame(self.canvas, bg="#ffffff")
-        self.canvas.create_window((0, 0), window=self.result_frame, anchor="center")
-
         # Create a vertical scrollbar linked to the canvas
         self.scrollbar = tk.Scrollbar(self.window, orient="vertical", command=self.canvas.yview)
         self.scrollbar.grid(row=1, column=3, sticky="ns")
-        self.result_frame.grid_columnconfigure(3, weight=1)
+        # Items et atlas du mode atlas, liberes a la recherche suivante
+        self.results = ResultSet()
 
         ###############
 
-        # Configure the canvas to scroll vertically
-        self.canvas.configure(yscrollcommand=self.scrollbar.set)
+        # Liste virtualisee : seules les lignes visibles existent, recyclees au defilement,
+        # et seules leurs vignettes sont chargees. Pas en mode atlas : elle recalculerait
+        # la zone de defilement du Canvas (a vide) a chaque redimensionnement.
+        self.pool = None
+        self.liste = None
+        if self.atlas_mode:
+            self.canvas.configure(yscrollcommand=self.scrollbar.set)
+        else:
+            self.pool = RowPool(self.canvas, self._creer_ligne)
+            self.liste = VirtualList(self.canvas, ROW_HEIGHT, self.pool, self._remplir_ligne,
+                                     on_range=self._charger_vignettes)
+            self.liste.attach_scrollbar(self.scrollbar)
+            # Lignes de la premiere vue construites des que la fenetre est au repos
+            self.window.after_idle(lambda: self.pool.reserve(self.liste.capacity()))
 
-        self.default_image = Image.open(BytesIO(requests.get(DEFAULT_IMAGE_URL).content))
+        self._default_image = None
+        self._default_photo = None
+        self._placeholder_image = None
 
         # Set row and column weights to allow expansion
         self.window.grid_rowconfigure(1, weight=1)
@@ -67,41 +133,134 @@ class RecipeApp(object):
 
         # Styliser le message de chargement
         self.waiting_label.configure(font=("Arial", 16, "italic"), fg=self.loading_color)
-
+        # Un seul minuteur de clignotement, quel que soit le nombre de recherches lancees
+        self.loading_animation = Animation(self.waiting_label, LOADING_BLINK_MS, self.toggle_loading_color)
+
+        # Recherche pendant la frappe : reponse locale tout de suite, appel a l'API
+        # seulement apres une pause
+        self.instant = InstantResults()
+        self._saisie = ""
+        self._saisie_timer = None
+        self.search_entry.bind("<KeyRelease>", self._on_saisie)
+
+
+    @property
+    def default_image(self):
+        # Image de secours lue sur le disque (deja a la taille des vignettes, avec bord),
+        # et seulement la premiere fois qu'on en a besoin
+        if self._default_image is None:
+            self._default_image = make_thumbnail(config.DEFAULT_IMAGE_PATH, (RECIPE_IMAGE_WIDTH, RECIPE_IMAGE_HEIGHT),
+                                                 RECIPE_IMAGE_BORDER)
+        return self._default_image
 
     def _run_search_query(self):
+        self._annuler_saisie()
+        # Recherche explicite : la page suivante est prechargee (liste virtualisee seulement)
+        self._lancer_recherche(self.search_entry.get(), paginate=not self.atlas_mode)
+
+    def _on_saisie(self, event):
+        text = self.search_entry.get().strip()
+        if text == self._saisie:
+            return
+        self._saisie = text
+        self._annuler_saisie()
+        if len(text) < config.SEARCH_MIN_CHARS:
+            return
+        # Reponse immediate : meme requete deja en cache disque, sinon recettes deja vues
+        # dont les ingredients commencent par ce qui est tape
+        recettes = self.engine.cached_recipes([text]) or self.instant.lookup(text)
+        if recettes:
+            # Les resultats locaux remplacent la recherche en cours : on l'abandonne, et
+            # son message de chargement avec
+            self.engine.cancel()
+            self._search_generation = None
+            self.loading_animation.stop()
+            self.waiting_label.config(text="")
+            self.afficher_recettes(recettes)
+        self._saisie_timer = self.window.after(config.SEARCH_DEBOUNCE_MS, self._recherche_saisie)
+
+    def _annuler_saisie(self):
+        if self._saisie_timer is not None:
+            self.window.after_cancel(self._saisie_timer)
+            self._saisie_timer = None
+
+    def _recherche_saisie(self):
+        # Frappe en pause : la recherche remplace (et annule) la precedente
+        self._saisie_timer = None
+        if [self._saisie] == self._ingredients and self._search_generation is not None:
+            # Deja la recherche affichee : pas de nouvel appel
+            return
+        self._lancer_recherche(self._saisie)
+
+    def _lancer_recherche(self, query, paginate=False):
+        self._quota_epuise = False
         # Afficher un message de chargement
         self.waiting_label.config(text="Loading...", font=("Times New Roman", 16, "italic"))
         # Afficher un message de chargement stylisé et animé
         self.animate_loading()
-        #query = self.search_entry.get()
-        # Run the search query in a separate thread
-        search_thread = threading.Thread(target=self._run_search_query_background)
-        search_thread.start()
-        #recipes = self.trouver_recette([query])
-        #if recipes:
-        #    self.afficher_recettes(recipes)
+        # La recherche tourne sur la boucle du moteur ; ses evenements passent par le dispatcher.
+        # Hors mode atlas, seules les vignettes de la premiere vue partent tout de suite.
+        prefetch_images = None if self.atlas_mode else self.liste.capacity()
+        self._ingredients = [query]
+        self._search_generation = self.engine.search(self._ingredients, prefetch_images=prefetch_images,
+                                                     paginate=paginate)
+        self.dispatcher.wake()
 
     def _update_gui(self, recipes):
-        # Masquez le message d'attente
+        # Masquez le message d'attente et arretez son clignotement
+        self.loading_animation.stop()
         self.waiting_label.config(text="")
-        #This will update the display of windows but not process events caused by the user.
-        self.window.update_idletasks()
         # Display the recipes
         if recipes:
             # Masquer le message d'attente
             self.waiting_label.config(text="recipes found", font=("Times New Roman", 16, "italic"))
+        elif self._quota_epuise:
+            # Plus de quota pour aujourd'hui et rien en cache : on le dit au lieu d'attendre
+            self.waiting_label.config(text="API quota exhausted, try again later.",
+                                      font=("Times New Roman", 16, "italic"))
         else:
             # Afficher un message si aucune recette n'est trouvée
             self.waiting_label.config(text="No recipes found.", font=("Times New Roman", 16, "italic"))
 
-    def _run_search_query_background(self):
-        query = self.search_entry.get()
-        recipes = self.trouver_recette([query])
-        if recipes:
-            self.afficher_recettes(recipes)
-        self.window.after(0, lambda: self._update_gui(recipes))
-
+    def _post_engine_event(self, event):
+        # Appele dans le thread du moteur : rien ne touche Tk ici. Dans une meme frame, les
+        # "recipes" successifs et les images d'une meme ligne se remplacent.
+        kind = event[0]
+        if kind == "recipes":
+            key = "recipes"
+        elif kind == "image":
+            key = ("image", event[1], event[2])
+        else:
+            key = None
+        self.dispatcher.post(self._handle_engine_event, event, key=key)
+
+    def _handle_engine_event(self, event):
+        kind, search_id = event[0], event[1]
+        # Toute reponse recue sert aux reponses locales, meme d'une recherche remplacee
+        if kind == "recipes":
+            self.instant.add(event[2])
+        elif kind == "page":
+            self.instant.add(event[3])
+        if search_id != self._search_generation:
+            # Recherche remplacee par une plus recente : rien a afficher
+            self.recettes.pop(search_id, None)
+            return
+        if kind == "recipes":
+            self.recettes[search_id] = event[2]
+            self.afficher_recettes(event[2])
+        elif kind == "image":
+            idx, key, img = event[2], event[3], event[4]
+            if self.atlas_mode:
+                self._afficher_vignette_atlas(idx, key, img)
+            else:
+                self._afficher_image(idx, key, img)
+        elif kind == "page":
+            self._afficher_page(event[2], event[3])
+        elif kind == "quota":
+            self._quota_epuise = True
+        elif kind == "done":
+            self.recettes.pop(search_id, None)
+            self._update_gui(event[2])
 
     def toggle_loading_color(self):
         # Alternance de couleurs pour créer un effet de clignotement
@@ -111,90 +270,209 @@ class RecipeApp(object):
             self.loading_color = "#F11A7B"
         # Appliquer la nouvelle couleur au label de chargement
         self.waiting_label.config(fg=self.loading_color)
-        # Continuer l'animation
-        self.animate_loading()
 
     def animate_loading(self):
-        # Changer la couleur du texte de chargement de façon clignotante
-        self.waiting_label.after(500, self.toggle_loading_color)
+        # Changer la couleur du texte de chargement de façon clignotante (sans effet si
+        # le clignotement est deja en cours)
+        self.loading_animation.start()
 
 
     def trouver_recette(self, ingredients):
-        base_url = 'https://api.spoonacular.com/recipes/findByIngredients'
-        ingr_string = ','.join(ingredients)
-        params = {
-            'ingredients': ingr_string,
-            'apiKey': self.api_key,
-            'number': 6,
-            'random': ''.join(random.choices(string.ascii_lowercase + string.digits, k=8))
-            # Append a random query string
-        }
-        response = requests.get(base_url, params=params)
-        if response.status_code == 200:
-            recettes = response.json()
-            return recettes
-        else:
-            return None
+        # Appel synchrone (sans interface) au moteur
+        return self.engine.run(self.engine.find_recipes(ingredients))
 
     def afficher_recettes(self, recettes):
+        # Les resultats precedents (widgets, images, atlas) sont liberes avant d'afficher
+        self.results.release()
+        self.results = ResultSet()
+        self._recettes_affichees = recettes or []
+        self._vignettes = {}
+        self._vignettes_demandees = set()
+        self._page = 0
+        self._page_demandee = False
+        self._plus_de_pages = self._page_pleine(self._recettes_affichees) and not self.atlas_mode
         if recettes:
+            # Titres et ingredients tout de suite, avec une vignette d'attente ; le moteur
+            # a deja lance les telechargements et chaque image remplace la sienne
+            # (_afficher_image) des son arrivee, dans n'importe quel ordre.
             print("Recettes trouvées:")
-            for idx, recette in enumerate(recettes):
-                title = recette.get('title')
-                title_label = tk.Label(self.result_frame, text=title, bg="#ffffff",font=("Times New Roman", 14, "bold"))
-                title_label.grid(row=idx, column=0, sticky='w', ipadx=10,ipady=10)  # Ajoutez ipadx et ipady pour le centrage
-                image_url = recette.get('image')
-                try:
-                    response = requests.get(image_url)
-                    img = Image.open(BytesIO(response.content))
-                    border_size = 10
-                    img_with_border = ImageOps.expand(img, border=border_size, fill='gray')
-                except Exception as e:
-                    print(f"Erreur lors du chargement de l'image : {e}")
-                    img_with_border = ImageOps.expand(self.default_image, border=border_size, fill='gray')
-
-                img = img.resize((RECIPE_IMAGE_WIDTH * 2, RECIPE_IMAGE_HEIGHT * 2))
-                photo = ImageTk.PhotoImage(img_with_border)
-                img_label = tk.Label(self.result_frame, image=photo, bg="#ffffff")
-                img_label.image = photo
-                img_label.grid(row=idx, column=1, sticky='nsew', ipadx=10,ipady=10)  # Ajoutez ipadx et ipady pour le centrage
-
-                missed_ingredient_count = recette.get('missedIngredientCount')
-                missing_ingredients = recette.get('missedIngredients')
-                if missed_ingredient_count:
-                    info_text = f"Missing Ingredients: {missed_ingredient_count}\n"
-                    for ingredient in missing_ingredients:
-                        info_text += f"- {ingredient.get('name')}\n"
-                    info_label = tk.Label(self.result_frame, text=info_text, bg="#ffffff", justify='left',font=("Times New Roman", 14, "bold"))
-                    info_label.grid(row=idx, column=2, sticky='w', ipadx=10,ipady=10)  # Ajoutez ipadx et ipady pour le centrage
-
-                    title_label.configure(bg="#ffffff")
-                    img_label.configure(bg="#ffffff")
-
-                    # Set row weights for the result_frame to allow expansion
-                    self.result_frame.grid_rowconfigure(idx, weight=1)
-                    self.result_frame.grid_rowconfigure(idx + 1, weight=1)
-                    self.result_frame.grid_rowconfigure(idx + 2, weight=1)
-
-                # Set row weights for the result_frame to allow expansion
-                # self.result_frame.grid_rowconfigure(idx, weight=1)
-
-                # Set column weights for the result_frame to allow expansion
-                self.result_frame.grid_columnconfigure(0, weight=1)
-                self.result_frame.grid_columnconfigure(1, weight=1)
-                self.result_frame.grid_columnconfigure(2, weight=1)
-                self.result_frame.grid_columnconfigure(3, weight=1)
-
-                info_label.configure(bg="#ffffff")
-                #Cela mettra à jour l'affichage des fenêtres mais ne traitera pas les événements provoqués par l'utilisateur.
-                self.canvas.update_idletasks()
-                # Cela signifie que lorsque vous faites défiler le contenu du canevas, la zone visible sera limitée à la région définie par la boîte englobante calculée, et le défilement sera activé si les éléments dépassent cette région.
-                self.canvas.config(scrollregion=self.canvas.bbox("all"))
-            else:
-                print("Aucune recette trouvée.")
+            if self.atlas_mode:
+                self._afficher_atlas(recettes)
+                if self._search_generation is None:
+                    # Resultats locaux : pas de recherche, donc pas de vignettes envoyees par
+                    # le moteur ; on pose celles deja en memoire
+                    for idx, recette in enumerate(recettes):
+                        url = recette.get('image')
+                        img = self.memory_cache.get_image(self.engine.thumbnail_key(url)) if url else None
+                        if img is not None:
+                            self.results.atlas.set_tile(idx, img)
+                return
+            # Vignettes deja demandees avec la recherche (premiere vue), sauf pour les
+            # resultats locaux (pas de recherche en cours)
+            if self._search_generation is not None:
+                self._vignettes_demandees.update(range(min(len(recettes), self.liste.capacity())))
+        else:
+            print("Aucune recette trouvée.")
+        if self.atlas_mode:
+            self.canvas.config(scrollregion=(0, 0, 0, 0))
+        else:
+            self.liste.set_count(len(self._recettes_affichees))
+
+    def _page_pleine(self, recettes):
+        # Page complete et limite de l'API pas atteinte : il peut y en avoir une autre
+        return (len(recettes) == config.SEARCH_PAGE_SIZE
+                and len(self._recettes_affichees) < config.SEARCH_MAX_RESULTS)
+
+    def _afficher_page(self, page, recettes):
+        # Page suivante : ajoutee sous les lignes deja affichees
+        if page != self._page + 1:
+            return
+        self._page = page
+        self._page_demandee = False
+        self._recettes_affichees = self._recettes_affichees + recettes
+        self._plus_de_pages = self._page_pleine(recettes)
+        self.liste.grow(len(self._recettes_affichees))
+
+    def _photo_for(self, key, img):
+        # PhotoImage deja construit pour cette vignette, sinon on le cree (depuis le cache
+        # PIL si besoin) et le garde ; None si l'image n'est plus en memoire
+        photo = self.memory_cache.get_photo(key) if key else None
+        if photo is None and key:
+            if img is None:
+                img = self.memory_cache.get_image(key)
+            if img is not None:
+                photo = ImageTk.PhotoImage(img)
+                self.memory_cache.put_photo(key, photo)
+        return photo
+
+    @property
+    def default_photo(self):
+        if self._default_photo is None:
+            self._default_photo = ImageTk.PhotoImage(self.default_image)
+        return self._default_photo
+
+    @property
+    def placeholder_image(self):
+        # Vignette d'attente unie, creee une seule fois (sans PIL)
+        if self._placeholder_image is None:
+            width = RECIPE_IMAGE_WIDTH + 2 * RECIPE_IMAGE_BORDER
+            height = RECIPE_IMAGE_HEIGHT + 2 * RECIPE_IMAGE_BORDER
+            self._placeholder_image = tk.PhotoImage(width=width, height=height)
+            self._placeholder_image.put("#e0e0e0", to=(0, 0, width, height))
+        return self._placeholder_image
+
+    def _afficher_image(self, idx, key, img):
+        # img vaut None en cas d'echec, ou si la vignette est deja en cache memoire
+        if key and self._photo_for(key, img) is None:
+            key = None
+        self._vignettes[idx] = key
+        row = self.liste.row(idx)
+        if row is not None:
+            self._remplir_vignette(row, idx)
+
+    def _creer_ligne(self, parent):
+        # Une ligne de la liste : titre, vignette et ingredients manquants
+        row = tk.Frame(parent, bg="#ffffff")
+        row.title_label = tk.Label(row, bg="#ffffff", wraplength=ATLAS_TITLE_WIDTH, font=("Times New Roman", 14, "bold"))
+        row.title_label.grid(row=0, column=0, sticky='w', ipadx=10, ipady=10)  # Ajoutez ipadx et ipady pour le centrage
+        row.img_label = tk.Label(row, bg="#ffffff")
+        row.img_label.grid(row=0, column=1, sticky='nsew', ipadx=10, ipady=10)
+        row.info_label = tk.Label(row, bg="#ffffff", justify='left', font=("Times New Roman", 14, "bold"))
+        row.info_label.grid(row=0, column=2, sticky='w', ipadx=10, ipady=10)
+        row.grid_rowconfigure(0, weight=1)
+        row.grid_columnconfigure(0, weight=1)
+        row.grid_columnconfigure(1, weight=1)
+        row.grid_columnconfigure(2, weight=1)
+        return row
+
+    def _remplir_ligne(self, row, idx):
+        recette = self._recettes_affichees[idx]
+        reconfigure(row.title_label, text=recette.get('title'))
+        reconfigure(row.info_label, text=self._texte_ingredients_manquants(recette) or "")
+        self._remplir_vignette(row, idx)
+
+    def _remplir_vignette(self, row, idx):
+        if idx not in self._vignettes:
+            photo = self.placeholder_image
+        else:
+            key = self._vignettes[idx]
+            photo = self._photo_for(key, None) if key else self.default_photo
+            if photo is None:
+                # Vignette sortie du cache memoire : on la redemandera (_charger_vignettes)
+                del self._vignettes[idx]
+                self._vignettes_demandees.discard(idx)
+                photo = self.placeholder_image
+        reconfigure(row.img_label, image=photo)
+        row.img_label.image = photo
+
+    def _charger_vignettes(self, first, last):
+        # Bientot en bas de la liste : page suivante (deja prechargee par le moteur)
+        if (self._plus_de_pages and not self._page_demandee and self._search_generation is not None
+                and last >= self.liste.count - config.SCROLL_PAGE_THRESHOLD):
+            self._page_demandee = True
+            self.engine.load_page(self._search_generation, self._ingredients, self._page + 1, prefetch_next=True)
+            self.dispatcher.wake()
+        # Seulement les lignes visibles, chacune demandee une fois par recherche
+        items = [(idx, self._recettes_affichees[idx].get('image')) for idx in range(first, last)
+                 if idx not in self._vignettes_demandees]
+        if not items:
+            return
+        self._vignettes_demandees.update(idx for idx, url in items)
+        if self._search_generation is None:
+            # Resultats locaux : seulement les vignettes deja en memoire
+            for idx, url in items:
+                key = self.engine.thumbnail_key(url) if url else None
+                if key and self._photo_for(key, None) is not None:
+                    self._afficher_image(idx, key, None)
+            return
+        self.engine.request_images(self._search_generation, items)
+        self.dispatcher.wake()
+
+    def _texte_ingredients_manquants(self, recette):
+        missed_ingredient_count = recette.get('missedIngredientCount')
+        missing_ingredients = recette.get('missedIngredients')
+        if not missed_ingredient_count:
+            return None
+        lines = [f"Missing Ingredients: {missed_ingredient_count}"]
+        names = [ingredient.get('name') for ingredient in missing_ingredients or []]
+        if len(names) > MISSING_INGREDIENTS_MAX_LINES:
+            shown = MISSING_INGREDIENTS_MAX_LINES - 1
+            lines += [f"- {name}" for name in names[:shown]]
+            lines.append(f"+{len(names) - shown} more")
+        else:
+            lines += [f"- {name}" for name in names]
+        return "\n".join(lines)
+
+    def _afficher_atlas(self, recettes):
+        # Page entiere dessinee sur le Canvas : textes en items, vignettes dans un atlas
+        tile_size = (RECIPE_IMAGE_WIDTH + 2 * RECIPE_IMAGE_BORDER, RECIPE_IMAGE_HEIGHT + 2 * RECIPE_IMAGE_BORDER)
+        row_height = tile_size[1] + ATLAS_ROW_PADDING
+        image_x = ATLAS_TITLE_WIDTH + 20
+        info_x = image_x + tile_size[0] + 20
+        for idx, recette in enumerate(recettes):
+            y = idx * row_height + row_height // 2
+            self.results.add_canvas_item(self.canvas, self.canvas.create_text(
+                10, y, text=recette.get('title'), anchor='w', width=ATLAS_TITLE_WIDTH,
+                font=("Times New Roman", 14, "bold")))
+            info_text = self._texte_ingredients_manquants(recette)
+            if info_text:
+                self.results.add_canvas_item(self.canvas, self.canvas.create_text(
+                    info_x, y, text=info_text, anchor='w', justify='left', font=("Times New Roman", 14, "bold")))
+        self.results.atlas = ThumbnailAtlas(self.canvas, image_x, 0, tile_size, row_height, len(recettes))
+        self.canvas.config(scrollregion=self.canvas.bbox("all"))
+
+    def _afficher_vignette_atlas(self, idx, key, img):
+        if img is None:
+            img = self.memory_cache.get_image(key) if key else None
+        self.results.atlas.set_tile(idx, img if img is not None else self.default_image)
 
     def run_app(self):
         self.window.mainloop()
+        self.engine.close()
+        self.response_cache.close()
+        self.corpus.close()
+        self.image_store.close()
+        self.session.close()
 
 
 if __name__ == "__main__":
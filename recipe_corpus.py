@@ -0,0 +1,165 @@
+import array
+import heapq
+import itertools
+import json
+import os
+import sqlite3
+import threading
+from bisect import bisect_left
+
+import config
+from response_cache import canonical_ingredients
+
+# Cle des listes de l'index : (nombre d'ingredients de la recette << ID_BITS) | id, pour
+# qu'un simple tri range les recettes du moins au plus d'ingredients
+ID_BITS = 32
+ID_MASK = (1 << ID_BITS) - 1
+EMPTY_POSTINGS = array.array('q')
+
+
+class RecipeCorpus(object):
+    # Corpus local de recettes (sqlite) avec un index inverse en memoire : ingredient
+    # canonique -> recettes qui le contiennent. Repond a la requete de findByIngredients
+    # (le plus d'ingredients utilises, puis le moins d'ingredients manquants) sans reseau,
+    # avec des dicts de la meme forme que ceux de l'API, et s'enrichit de ses reponses.
+    def __init__(self, path=None):
+        self.path = path or os.path.join(config.CACHE_DIR, "corpus.sqlite3")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS recipes ("
+                         "id INTEGER PRIMARY KEY, title TEXT, image TEXT, image_type TEXT, likes INTEGER, "
+                         "ingredients TEXT)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS recipe_ingredients (name TEXT, recipe_id INTEGER, total INTEGER)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS recipe_ingredients_by_name "
+                         "ON recipe_ingredients (name, total, recipe_id)")
+        self._db.commit()
+        self._postings = {}
+        # L'index se construit en tache de fond ; en attendant, find_recipes renvoie None
+        self.ready = threading.Event()
+        threading.Thread(target=self._load, name="recipe-corpus", daemon=True).start()
+
+    def _load(self):
+        with self._lock:
+            rows = self._db.execute("SELECT name, total, recipe_id FROM recipe_ingredients "
+                                    "ORDER BY name, total, recipe_id")
+            for name, group in itertools.groupby(rows, key=lambda row: row[0]):
+                self._postings[name] = array.array('q', (total << ID_BITS | recipe_id
+                                                         for name, total, recipe_id in group))
+        self.ready.set()
+
+    def add(self, recipes):
+        # Reponses de findByIngredients (usedIngredients + missedIngredients) ou recettes
+        # completes (extendedIngredients) ; une recette deja connue n'est pas modifiee
+        with self._lock:
+            for recipe in recipes or []:
+                recipe_id = recipe.get('id')
+                ingredients = _recipe_ingredients(recipe)
+                if recipe_id is None or not ingredients:
+                    continue
+                if self._db.execute("SELECT 1 FROM recipes WHERE id = ?", (recipe_id,)).fetchone():
+                    continue
+                names = {_canonical_name(ingredient) for ingredient in ingredients}
+                self._db.execute("INSERT INTO recipes VALUES (?, ?, ?, ?, ?, ?)",
+                                 (recipe_id, recipe.get('title'), recipe.get('image'), recipe.get('imageType'),
+                                  recipe.get('likes', 0), json.dumps(ingredients)))
+                self._db.executemany("INSERT INTO recipe_ingredients VALUES (?, ?, ?)",
+                                     [(name, recipe_id, len(names)) for name in names])
+                key = len(names) << ID_BITS | recipe_id
+                for name in names:
+                    postings = self._postings.setdefault(name, array.array('q'))
+                    postings.insert(bisect_left(postings, key), key)
+            self._db.commit()
+
+    def find_recipes(self, ingredients, number):
+        # Meme reponse que findByIngredients pour ces ingredients (noms exacts, apres
+        # mise en minuscules), ou None tant que l'index n'est pas pret
+        if not self.ready.is_set():
+            return None
+        names = canonical_ingredients(ingredients)
+        if not names:
+            return []
+        with self._lock:
+            ranked = _rank([self._postings.get(name, EMPTY_POSTINGS) for name in names], number)
+            if not ranked:
+                return []
+            placeholders = ','.join('?' * len(ranked))
+            rows = {row[0]: row for row in self._db.execute(
+                f"SELECT id, title, image, image_type, likes, ingredients FROM recipes WHERE id IN ({placeholders})",
+                ranked)}
+        return [_as_result(rows[recipe_id], names) for recipe_id in ranked if recipe_id in rows]
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM recipes").fetchone()[0]
+
+    def close(self):
+        self.ready.wait()
+        with self._lock:
+            self._db.close()
+
+
+def _rank(postings, number):
+    # Une recette qui utilise au moins t des k ingredients demandes figure forcement dans
+    # l'une des k - t + 1 listes les plus courtes. Pour t = k, k - 1, ... on ne parcourt
+    # donc que ces listes, fusionnees (une recette y revient a la suite, une fois par liste,
+    # du moins au plus d'ingredients manquants), et on complete le compte par dichotomie
+    # dans les autres. On s'arrete des que la page est pleine : les ingredients rares
+    # limitent le parcours, les ingredients courants remplissent vite la page.
+    postings = sorted(postings, key=len)
+    wanted = len(postings)
+    ranked = []
+    for used_min in range(wanted, 0, -1):
+        drivers = postings[:wanted - used_min + 1]
+        others = postings[wanted - used_min + 1:]
+        for key, group in itertools.groupby(heapq.merge(*drivers)):
+            used = sum(1 for _ in group) + sum(1 for keys in others if _contains(keys, key))
+            if used == used_min:
+                ranked.append(key & ID_MASK)
+                if len(ranked) == number:
+                    return ranked
+    return ranked
+
+
+def _contains(keys, key):
+    i = bisect_left(keys, key)
+    return i < len(keys) and keys[i] == key
+
+
+def _as_result(row, names):
+    recipe_id, title, image, image_type, likes, ingredients = row
+    wanted = set(names)
+    used, missed = [], []
+    for ingredient in json.loads(ingredients):
+        (used if _canonical_name(ingredient) in wanted else missed).append(ingredient)
+    found = {_canonical_name(ingredient) for ingredient in used}
+    return {
+        'id': recipe_id,
+        'title': title,
+        'image': image,
+        'imageType': image_type,
+        'usedIngredientCount': len(used),
+        'missedIngredientCount': len(missed),
+        'usedIngredients': used,
+        'missedIngredients': missed,
+        'unusedIngredients': [{'name': name} for name in names if name not in found],
+        'likes': likes,
+    }
+
+
+def _recipe_ingredients(recipe):
+    if recipe.get('extendedIngredients'):
+        ingredients = recipe['extendedIngredients']
+    else:
+        ingredients = (recipe.get('usedIngredients') or []) + (recipe.get('missedIngredients') or [])
+    # Un ingredient par nom canonique
+    unique = {}
+    for ingredient in ingredients:
+        name = _canonical_name(ingredient)
+        if name and name not in unique:
+            unique[name] = ingredient
+    return list(unique.values())
+
+
+def _canonical_name(ingredient):
+    return (ingredient.get('name') or '').strip().lower()
@@ -0,0 +1,87 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlencode
+
+import config
+
+# Parametres qui ne changent pas la reponse et ne doivent pas entrer dans la cle
+IGNORED_PARAMS = ('random', 'apiKey')
+
+
+def canonical_key(url, params):
+    # Forme canonique d'une requete : sans cache-buster ni cle d'API, ingredients
+    # en minuscules, dedoublonnes et tries, parametres tries.
+    canonical = {}
+    for name, value in params.items():
+        if name in IGNORED_PARAMS:
+            continue
+        if name == 'ingredients':
+            value = ','.join(canonical_ingredients(value.split(',')))
+        canonical[name] = str(value)
+    return url + '?' + urlencode(sorted(canonical.items()))
+
+
+def canonical_ingredients(ingredients):
+    return sorted({ingredient.strip().lower() for ingredient in ingredients if ingredient.strip()})
+
+
+class ResponseCache(object):
+    # Cache persistant (sqlite) des reponses JSON de l'API, avec duree de validite
+    # et taille maximale ; au-dela, les entrees les moins recemment lues partent.
+    def __init__(self, path=None, ttl=None, max_bytes=None):
+        self.path = path or os.path.join(config.CACHE_DIR, "responses.sqlite3")
+        self.ttl = config.RESPONSE_CACHE_TTL if ttl is None else ttl
+        self.max_bytes = config.RESPONSE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS responses ("
+                         "key TEXT PRIMARY KEY, value TEXT, size INTEGER, created REAL, accessed REAL)")
+        self._db.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, created = row
+            if now - created > self.ttl:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+            self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._db.commit()
+        return json.loads(value)
+
+    def put(self, key, data):
+        value = json.dumps(data)
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                             (key, value, len(value), now, now))
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,47 @@
+class ResultSet(object):
+    # Un affichage de resultats : possede ses widgets, ses images et ses items de
+    # Canvas, et les libere tous d'un coup (release) quand il est remplace. La memoire
+    # reste ainsi stable d'une recherche a l'autre.
+    def __init__(self):
+        self.widgets = []
+        self.images = []
+        self.image_labels = {}
+        self.canvas_items = []
+        self.pooled_rows = []
+        self.atlas = None
+
+    def add_row(self, pool, row):
+        # Ligne pretee par un RowPool : rendue (pas detruite) au release
+        self.pooled_rows.append((pool, row))
+        return row
+
+    def add(self, widget):
+        self.widgets.append(widget)
+        return widget
+
+    def add_image(self, photo):
+        # Garder une reference : Tk n'affiche plus un PhotoImage ramasse par Python
+        self.images.append(photo)
+        return photo
+
+    def add_canvas_item(self, canvas, item):
+        self.canvas_items.append((canvas, item))
+        return item
+
+    def release(self):
+        for widget in self.widgets:
+            widget.destroy()
+        for canvas, item in self.canvas_items:
+            canvas.delete(item)
+        for pool, row in self.pooled_rows:
+            row.grid_remove()
+            pool.release(row)
+        if self.atlas is not None:
+            self.atlas.destroy()
+        self.widgets = []
+        self.images = []
+        self.image_labels = {}
+        self.canvas_items = []
+        self.pooled_rows = []
+        self.atlas = None
+
@@ -0,0 +1,36 @@
+class RowPool(object):
+    # Reserve de lignes de resultat deja construites (Frame + Labels). Une ligne rendue
+    # est reconfiguree sur place a la prochaine utilisation ; on n'en cree une nouvelle
+    # que si la reserve est vide.
+    def __init__(self, parent, create_row):
+        self.parent = parent
+        self.create_row = create_row
+        self.created = 0
+        self._free = []
+
+    def acquire(self):
+        if self._free:
+            return self._free.pop()
+        self.created += 1
+        return self.create_row(self.parent)
+
+    def release(self, row):
+        self._free.append(row)
+
+    def reserve(self, count):
+        # Construire d'avance de quoi afficher count lignes
+        while len(self._free) < count:
+            self.created += 1
+            self._free.append(self.create_row(self.parent))
+
+
+def reconfigure(widget, **options):
+    # configure() seulement pour les options qui changent : Tk recalcule la geometrie
+    # a chaque appel, meme si la valeur est la meme. Le cache porte un nom que tkinter
+    # n'utilise pas (Misc._options est une methode).
+    current = widget.__dict__.setdefault('_row_pool_options', {})
+    changed = {name: value for name, value in options.items()
+               if name not in current or current[name] != value}
+    if changed:
+        widget.configure(**changed)
+        current.update(changed)
@@ -0,0 +1,49 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import config
+
+
+class HttpSession(object):
+    # Une seule session requests pour toute l'application : les connexions TCP/TLS
+    # restent ouvertes (keep-alive) et sont reutilisees d'une recherche a l'autre,
+    # au lieu d'un nouveau handshake a chaque requests.get.
+    def __init__(self, pool_sizes=None, timeout=None):
+        self.pool_sizes = config.HTTP_POOL_SIZES if pool_sizes is None else pool_sizes
+        self.timeout = config.HTTP_TIMEOUT if timeout is None else timeout
+        self._lock = threading.Lock()
+        self._session = self._build_session()
+
+    def _build_session(self):
+        session = requests.Session()
+        default_adapter = HTTPAdapter(pool_connections=config.HTTP_POOL_DEFAULT_HOSTS,
+                                      pool_maxsize=config.HTTP_POOL_DEFAULT_SIZE,
+                                      max_retries=self._retries())
+        session.mount("https://", default_adapter)
+        session.mount("http://", default_adapter)
+        # Un adaptateur par hote connu, pour dimensionner son pool separement
+        for host, size in self.pool_sizes.items():
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size, max_retries=self._retries())
+            session.mount("https://" + host + "/", adapter)
+            session.mount("http://" + host + "/", adapter)
+        return session
+
+    def _retries(self):
+        # Seules les erreurs de connexion et de lecture sont retentees ici ; les
+        # reponses 429 / 5xx sont gerees par le RateLimiter.
+        return Retry(total=config.HTTP_RETRIES, connect=config.HTTP_RETRIES, read=config.HTTP_RETRIES,
+                     status=0, backoff_factor=config.HTTP_RETRY_BACKOFF, allowed_methods=["GET"],
+                     raise_on_status=False)
+
+    def get(self, url, **kwargs):
+        # Les pools urllib3 sont thread-safe, on peut donc partager la session
+        # entre les threads de recherche.
+        kwargs.setdefault("timeout", self.timeout)
+        return self._session.get(url, **kwargs)
+
+    def close(self):
+        with self._lock:
+            self._session.close()
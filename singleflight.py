@@ -0,0 +1,45 @@
+import asyncio
+
+
+class SingleFlight(object):
+    # Regroupe les appels identiques en cours : le premier lance le travail, les
+    # suivants attendent le meme resultat au lieu de refaire l'appel reseau.
+    # Quand tous les appelants ont ete annules, le travail partage l'est aussi.
+    # A utiliser depuis une seule boucle asyncio (pas de verrou).
+    def __init__(self):
+        self._inflight = {}
+
+    async def do(self, key, coro_factory):
+        flight = self._inflight.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(coro_factory()))
+            self._inflight[key] = flight
+            flight.future.add_done_callback(lambda done: self._forget(key, done))
+        flight.waiters += 1
+        try:
+            # shield : si un appelant est annule, le travail partage continue pour les autres
+            return await asyncio.shield(flight.future)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.future.done():
+                # Plus personne n'attend ce resultat : inutile de continuer
+                flight.future.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _forget(self, key, future):
+        flight = self._inflight.get(key)
+        if flight is not None and flight.future is future:
+            del self._inflight[key]
+        # Evite l'avertissement "exception never retrieved" si tous les appelants sont partis
+        if not future.cancelled():
+            future.exception()
+
+    def __len__(self):
+        return len(self._inflight)
+
+
+class _Flight(object):
+    def __init__(self, future):
+        self.future = future
+        self.waiters = 0
@@ -0,0 +1,91 @@
+import warnings
+from io import BytesIO
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+import config
+
+
+class ImageRejected(Exception):
+    # Image refusee avant decodage : trop lourde, trop grande ou illisible
+    pass
+
+
+def read_image_response(response, max_bytes=None, max_pixels=None):
+    # Lit une reponse ouverte avec stream=True morceau par morceau. Le volume total
+    # est plafonne, et l'en-tete est analyse au fil de l'eau (Image.open ne lit que
+    # l'en-tete) pour abandonner des que les dimensions sont connues et excessives.
+    max_bytes = config.IMAGE_MAX_BYTES if max_bytes is None else max_bytes
+    max_pixels = config.IMAGE_MAX_PIXELS if max_pixels is None else max_pixels
+    try:
+        length = response.headers.get('Content-Length')
+        if length and length.isdigit() and int(length) > max_bytes:
+            raise ImageRejected(f"image trop lourde ({length} octets)")
+        buffer = bytearray()
+        header_checked = False
+        for chunk in response.iter_content(config.IMAGE_CHUNK_SIZE):
+            buffer += chunk
+            if len(buffer) > max_bytes:
+                raise ImageRejected(f"image trop lourde (plus de {max_bytes} octets)")
+            if not header_checked:
+                header_checked = _check_header(buffer, max_pixels)
+        return bytes(buffer)
+    finally:
+        response.close()
+
+
+def _check_header(buffer, max_pixels):
+    # True quand l'en-tete a ete lu et accepte, False s'il faut plus de donnees
+    try:
+        with Image.open(BytesIO(buffer)) as img:
+            width, height = img.size
+    except (UnidentifiedImageError, OSError, SyntaxError):
+        if len(buffer) >= config.IMAGE_HEADER_PROBE_BYTES:
+            raise ImageRejected("en-tete d'image introuvable")
+        return False
+    except Image.DecompressionBombError as e:
+        raise ImageRejected(str(e))
+    if width * height > max_pixels:
+        raise ImageRejected(f"image trop grande ({width}x{height})")
+    return True
+
+
+def make_thumbnail(source, size, border=0, border_fill='gray', exact=False):
+    # Decode une image directement a la taille d'affichage : `source` est le contenu
+    # (bytes) ou un chemin. Le bord eventuel est ajoute une seule fois, a la fin.
+    # exact=True deforme l'image pour remplir `size`, sinon elle y est contenue.
+    img = Image.open(BytesIO(source) if isinstance(source, (bytes, bytearray)) else source)
+    # JPEG : decodage a l'echelle reduite (1/2, 1/4, 1/8) la plus proche de la cible
+    img.draft('RGB', size)
+    img.load()
+    if img.mode not in ('RGB', 'RGBA', 'L'):
+        img = img.convert('RGBA' if 'A' in img.getbands() or 'transparency' in img.info else 'RGB')
+    # Autres formats : reduction entiere rapide avant le redimensionnement final
+    factor = min(img.width // size[0], img.height // size[1])
+    if factor >= 2:
+        img = img.reduce(factor)
+    if exact:
+        img = img.resize(size, Image.LANCZOS)
+    else:
+        img = ImageOps.contain(img, size, Image.LANCZOS)
+    if border:
+        img = ImageOps.expand(img, border=border, fill=border_fill)
+    return img
+
+
+def init_worker(max_pixels):
+    # Initialisation d'un processus de preparation : les images trop grandes
+    # levent une erreur au lieu d'un simple avertissement
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    warnings.simplefilter('error', Image.DecompressionBombWarning)
+
+
+def prepare_thumbnail(data, size, border=0):
+    # Execute dans un processus de travail : des octets telecharges a un tampon de
+    # pixels (mode, taille, octets) pret a afficher
+    img = make_thumbnail(data, size, border)
+    return img.mode, img.size, img.tobytes()
+
+
+def thumbnail_from_buffer(buffer):
+    mode, size, pixels = buffer
+    return Image.frombytes(mode, size, pixels)
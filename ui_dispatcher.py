@@ -0,0 +1,60 @@
+import threading
+import traceback
+
+import config
+
+
+class UiDispatcher(object):
+    # File de mises a jour de l'interface : n'importe quel thread y depose un appel
+    # (post), et la boucle Tk les execute par lots, une fois par frame, avec `after`.
+    # Tout le travail sur les widgets reste ainsi dans le thread principal.
+    #
+    # Aucun appel Tk n'est fait depuis un autre thread : la boucle ne tourne que tant que
+    # keep_alive() est vrai (travail en cours dans le moteur) ou que la file n'est pas
+    # vide. Le thread principal la relance avec wake() quand il lance du travail.
+    def __init__(self, widget, keep_alive=None, interval=None):
+        self.widget = widget
+        self.keep_alive = keep_alive or (lambda: False)
+        self.interval = config.UI_FRAME_MS if interval is None else interval
+        self._lock = threading.Lock()
+        self._pending = []
+        self._keyed = {}
+        self._scheduled = False
+
+    def post(self, func, *args, key=None):
+        # Thread-safe. Deux appels avec la meme cle dans la meme frame : seul le dernier
+        # est execute, a la place du premier.
+        with self._lock:
+            if key is not None and key in self._keyed:
+                self._pending[self._keyed[key]] = (func, args)
+                return
+            if key is not None:
+                self._keyed[key] = len(self._pending)
+            self._pending.append((func, args))
+
+    def wake(self):
+        # Thread principal seulement
+        if not self._scheduled:
+            self._scheduled = True
+            self.widget.after(self.interval, self._tick)
+
+    def _tick(self):
+        # keep_alive d'abord : un travail termine a deja tout depose dans la file
+        alive = self.keep_alive()
+        with self._lock:
+            batch = self._pending
+            self._pending = []
+            self._keyed = {}
+        try:
+            for func, args in batch:
+                # Une mise a jour en erreur ne doit pas faire perdre les suivantes du lot
+                # (dont "done", qui arrete l'animation de chargement)
+                try:
+                    func(*args)
+                except Exception:
+                    traceback.print_exc()
+        finally:
+            if alive or batch:
+                self.widget.after(self.interval, self._tick)
+            else:
+                self._scheduled = False
@@ -0,0 +1,115 @@
+import config
+
+# Position des lignes inutilisees, hors de la zone de defilement
+HIDDEN_POSITION = (-10000, -10000)
+
+
+class VirtualList(object):
+    # Liste virtualisee sur un Canvas : seules les lignes visibles (plus une marge,
+    # l'overscan) existent en widgets. En defilant, les lignes qui sortent de la vue
+    # sont cachees et rendues au RowPool, qui les reprete a celles qui entrent
+    # (bind_row les remplit).
+    def __init__(self, canvas, row_height, pool, bind_row, overscan=None, on_range=None):
+        self.canvas = canvas
+        self.row_height = row_height
+        self.pool = pool
+        self.bind_row = bind_row
+        self.overscan = config.VIRTUAL_LIST_OVERSCAN if overscan is None else overscan
+        # Appele avec (premier, dernier) apres chaque mise a jour, pour charger les images
+        self.on_range = on_range
+        self.count = 0
+        self._bound = {}
+        self._windows = {}
+        self._scrollbar = None
+        self._view = None
+        self._refresh_pending = None
+        self.canvas.configure(yscrollcommand=self._on_scroll)
+        self.canvas.bind("<Configure>", self._on_configure, add="+")
+
+    def attach_scrollbar(self, scrollbar):
+        self._scrollbar = scrollbar
+        scrollbar.configure(command=self.canvas.yview)
+
+    def set_count(self, count):
+        # Nouvelle liste : les lignes affichees retournent a la reserve, on revient en haut
+        for idx in list(self._bound):
+            self._hide(idx)
+        self.count = count
+        self._view = None
+        self._update_scrollregion()
+        self.canvas.yview_moveto(0)
+        self.refresh()
+
+    def grow(self, count):
+        # Lignes ajoutees en fin de liste (page suivante) : la vue ne bouge pas
+        self.count = count
+        self._update_scrollregion()
+        self.refresh()
+
+    def row(self, idx):
+        # Widget affichant la ligne idx, ou None si elle n'est pas dans la vue
+        return self._bound.get(idx)
+
+    def capacity(self):
+        # Nombre de lignes creees pour une vue en haut de liste
+        height = max(self.canvas.winfo_height(), self.canvas.winfo_reqheight())
+        return height // self.row_height + 1 + self.overscan
+
+    def visible_range(self):
+        top = int(self.canvas.canvasy(0))
+        height = max(self.canvas.winfo_height(), 1)
+        first = max(0, top // self.row_height - self.overscan)
+        last = min(self.count, (top + height) // self.row_height + 1 + self.overscan)
+        return first, max(first, last)
+
+    def schedule_refresh(self):
+        # Plusieurs evenements de defilement dans la meme frame : une seule mise a jour
+        if self._refresh_pending is None:
+            self._refresh_pending = self.canvas.after_idle(self.refresh)
+
+    def refresh(self):
+        if self._refresh_pending is not None:
+            self.canvas.after_cancel(self._refresh_pending)
+            self._refresh_pending = None
+        first, last = self.visible_range()
+        for idx in [idx for idx in self._bound if not first <= idx < last]:
+            self._hide(idx)
+        width = self.canvas.winfo_width()
+        for idx in range(first, last):
+            if idx in self._bound:
+                continue
+            row = self.pool.acquire()
+            self._bound[idx] = row
+            self.bind_row(row, idx)
+            window = self._windows.get(row)
+            if window is None:
+                self._windows[row] = self.canvas.create_window(0, idx * self.row_height, window=row, anchor="nw",
+                                                               width=width, height=self.row_height)
+            else:
+                self.canvas.coords(window, 0, idx * self.row_height)
+                self.canvas.itemconfigure(window, width=width)
+        if self.on_range is not None and last > first:
+            self.on_range(first, last)
+
+    def _hide(self, idx):
+        row = self._bound.pop(idx)
+        self.canvas.coords(self._windows[row], *HIDDEN_POSITION)
+        self.pool.release(row)
+
+    def _update_scrollregion(self):
+        self.canvas.configure(scrollregion=(0, 0, self.canvas.winfo_width(), self.count * self.row_height))
+
+    def _on_scroll(self, first, last):
+        if self._scrollbar is not None:
+            self._scrollbar.set(first, last)
+        # Tk rappelle aussi yscrollcommand sans que la vue ait bouge
+        if (first, last) != self._view:
+            self._view = (first, last)
+            self.schedule_refresh()
+
+    def _on_configure(self, event):
+        width = self.canvas.winfo_width()
+        for window in self._windows.values():
+            self.canvas.itemconfigure(window, width=width)
+        self._update_scrollregion()
+        self.schedule_refresh()